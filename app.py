@@ -1,40 +1,71 @@
 # -*- coding: utf-8 -*-
+import asyncio
+import itertools
+import json
 import os
+import re
+from contextlib import asynccontextmanager
 
 import uvicorn
 from fastapi import FastAPI
-from fastapi import Form, Request, HTTPException
+from fastapi import Form, Request, HTTPException, UploadFile, File
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from loguru import logger
 
 from src.address_parsing import address_parsing
+from src.batch_rendering import ArchiveStream
 from src.checking_availability import get_missing_ids
-from src.database import import_excel_to_db, database_cleaning_function
+from src.database import (
+    import_excel_to_db, replace_employees, sync_employees, database_cleaning_function, db, connection, run_query,
+    migrate_database, parse_tab_number, Employee, replace_target_list, read_target_list, seed_target_lists
+)
+from src.employee_index import EmployeeIndex
 from src.filling_data import (
     formation_employment_contracts_filling_data,
     formation_and_filling_of_employment_contracts_for_idle_time_enterprise,
     formation_and_filling_of_part_time_employment_contracts,
     formation_and_filling_of_employment_contracts_for_transfer_to_another_job,
     filling_ditional_agreement_health_reasons, filling_notifications,
-    filling_ditional_agreement_health_reasons_agreement_health
+    filling_ditional_agreement_health_reasons_agreement_health, TARGET_LISTS
 )
 from src.formation_reduction_notification import formation_reduction_notification
-from src.get import Employee
+from src.jobs import JobQueue
+from src.template_routing import contract_router
+from src.uploads import save_upload, resolve_input_path, remove_upload, original_name
 from src.parsing_comparison_file import parsing_document_1, compare_and_rewrite_professions
 from src.receipt_contract import process_single_contract  # ДОБАВЛЕНО
 
 file = "data/list_gup/Списочный_состав.xlsx"
-
-app = FastAPI()
+job_queue = JobQueue()  # Очередь длительных задач (формирование документов, парсинг Excel)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Запуск и остановка приложения"""
+    # Индекс сотрудников для /get_contract строится в фоне сразу при запуске
+    app.state.employee_index = EmployeeIndex(file)
+    if os.path.exists(file):
+        app.state.employee_index.refresh_in_background()
+    # Проверка таблицы маршрутов шаблонов трудовых договоров по файлам на диске
+    contract_router.validate()
+    # Создание таблиц и обновление схемы базы данных (колонка tab_number, перенос data/data.db)
+    with connection():
+        migrate_database()
+        seed_target_lists(TARGET_LISTS)  # Списки по умолчанию заносятся один раз, загруженные не перезаписываются
+    yield
+    job_queue.shutdown()
+    db.close_all()  # Закрываем подключения пула базы данных
+
+
+app = FastAPI(lifespan=lifespan)
 # Монтируем статические файлы из папки "static"
 app.mount("/static", StaticFiles(directory="static"), name="static")
 # Монтируем папку data
 app.mount("/data", StaticFiles(directory="data"), name="data")
 templates = Jinja2Templates(directory="templates")
-progress_messages = []  # список сообщений, которые будут отображаться в progress
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -75,10 +106,127 @@ async def import_excel(min_row: int = Form(...), max_row: int = Form(...)):
         raise HTTPException(status_code=500, detail="Произошла ошибка при импорте данных.")
 
 
+@app.post("/import_excel/upload")
+async def import_excel_upload(
+        workbook: UploadFile = File(...),
+        min_row: int = Form(...),
+        max_row: int = Form(None),
+        mode: str = Form("replace"),
+):
+    """
+    Загрузка нового списочного состава: файл сохраняется на диск фрагментами, строки читаются потоково.
+    mode=replace - строки через промежуточную таблицу одной транзакцией заменяют сотрудников в базе данных;
+    mode=sync - применяется только разница по табельному номеру (добавление, изменение, удаление) с отчетом.
+    Загруженный файл становится data/list_gup/Списочный_состав.xlsx (индекс /get_contract перестраивается по нему).
+    """
+    if mode not in ("replace", "sync"):
+        raise HTTPException(status_code=400, detail=f"Неизвестный режим загрузки: {mode}")
+    job_type = "import_excel"
+    if job_queue.active(job_type) is not None:
+        raise HTTPException(status_code=409, detail="Списочный состав уже загружается")
+    upload = await save_upload(workbook)
+
+    async def load():
+        try:
+            if mode == "sync":
+                result = await run_query(sync_employees, upload, min_row, max_row)
+            else:
+                result = {"imported": await run_query(replace_employees, upload, min_row, max_row)}
+            os.makedirs(os.path.dirname(file), exist_ok=True)
+            os.replace(upload, file)  # Замена файла списочного состава одним переименованием
+            return result
+        finally:
+            remove_upload(upload)
+
+    job = job_queue.submit(job_type, load)
+    return JSONResponse(job.to_dict(), status_code=202)
+
+
+@app.get("/target_lists/{list_name}")
+async def get_target_list(list_name: str):
+    """Табельные номера списка (простой, неполная_рабочая_неделя, перевод_на_другую_работу и т.д.)"""
+    if list_name not in TARGET_LISTS:
+        raise HTTPException(status_code=404, detail=f"Неизвестный список: {list_name}")
+    tab_numbers = await run_query(read_target_list, list_name)
+    if tab_numbers is None:  # Список еще не занесен в базу данных - действует список по умолчанию
+        tab_numbers = sorted(set(TARGET_LISTS[list_name]))
+    return JSONResponse({"list_name": list_name, "tab_numbers": tab_numbers})
+
+
+@app.post("/target_lists/{list_name}")
+async def upload_target_list(list_name: str, file: UploadFile = File(...)):
+    """Замена списка табельных номеров загруженным текстовым файлом (номера через пробел, запятую или с новой строки)"""
+    if list_name not in TARGET_LISTS:
+        raise HTTPException(status_code=404, detail=f"Неизвестный список: {list_name}")
+    content = (await file.read()).decode("utf-8", errors="ignore")
+    tab_numbers = [int(number) for number in re.findall(r"\d+", content)]
+    await run_query(replace_target_list, list_name, tab_numbers)
+    return JSONResponse({"list_name": list_name, "count": len(set(tab_numbers))})
+
+
+async def input_file(file, path):
+    """
+    Файл Excel для задачи: загруженный (сохраняется на диск фрагментами) или путь к файлу на сервере
+
+    Returns:
+        tuple: (путь к файлу, True - файл загружен и удаляется после обработки)
+    """
+    if file is not None and file.filename:
+        return await save_upload(file), True
+    try:
+        return resolve_input_path(path), False
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/professions/mapping")
+async def load_profession_mapping(
+        file: UploadFile = File(None),
+        path: str = Form(None),
+        min_row: int = Form(5),
+        max_row: int = Form(1084),
+        column: int = Form(5),
+        column_1: int = Form(8),
+):
+    """
+    Загрузка соответствия табельный номер -> профессия из списочного состава (файл загружается или
+    указывается путем на сервере). Таблица соответствия заменяется целиком, поэтому задача выполняется одна.
+    """
+    job_type = "parsing_document_1"
+    if job_queue.active(job_type) is not None:
+        raise HTTPException(status_code=409, detail="Соответствие профессий уже загружается")
+    filename, uploaded = await input_file(file, path)
+
+    async def load():
+        try:
+            await parsing_document_1(filename, min_row=min_row, max_row=max_row, column=column, column_1=column_1)
+        finally:
+            if uploaded:
+                remove_upload(filename)
+
+    job = job_queue.submit(job_type, load)
+    return JSONResponse(job.to_dict(), status_code=202)
+
+
+@app.post("/professions/compare")
+async def compare_professions(file: UploadFile = File(None), path: str = Form(None)):
+    """
+    Сверка и перезапись профессий в файле Excel (загруженном или на сервере). Разные файлы обрабатываются
+    одновременно; исправленный файл доступен по /jobs/{job_id}/download.
+    """
+    filename, _ = await input_file(file, path)
+    job_type = f"compare_and_rewrite_professions:{os.path.abspath(filename)}"
+    if job_queue.active(job_type) is not None:
+        raise HTTPException(status_code=409, detail="Этот файл уже обрабатывается")
+    job = job_queue.submit(job_type, compare_and_rewrite_professions, filename)
+    return JSONResponse(job.to_dict(), status_code=202)
+
+
 def search_employee_by_tab_number(tab_number):
     """Ищем данные сотрудника по табельному номеру"""
     try:
-        return Employee.get(Employee.a4_табельный_номер == tab_number)
+        with connection():
+            return Employee.get(Employee.tab_number == parse_tab_number(tab_number))
     except Employee.DoesNotExist:
         return None
 
@@ -109,8 +257,11 @@ async def get_contract_process(
                 }
             )
 
-        # Обрабатываем один договор
-        result = process_single_contract(file, int(tab_number))
+        # Обрабатываем один договор в пуле потоков: первый запрос и поиск во время перестроения индекса
+        # ждут построения индекса, рендеринг договора тоже не должен блокировать цикл событий
+        result = await asyncio.to_thread(
+            process_single_contract, file, int(tab_number), index=request.app.state.employee_index
+        )
 
         if result is False:  # Сотрудник не найден
             return templates.TemplateResponse(
@@ -193,18 +344,36 @@ async def notification_compression(request: Request):
     return templates.TemplateResponse("notification_compression.html", {"request": request})
 
 
+# Длительные действия выполняются в фоне через очередь задач: номер действия -> (тип задачи, функция)
+BACKGROUND_ACTIONS = {
+    2: ("formation_employment_contracts", formation_employment_contracts_filling_data),
+    8: ("idle_time_enterprise", formation_and_filling_of_employment_contracts_for_idle_time_enterprise),
+    9: ("part_time_employment_contracts", formation_and_filling_of_part_time_employment_contracts),
+    10: ("ditional_agreement_health_reasons", filling_ditional_agreement_health_reasons),
+    11: ("transfer_to_another_job", formation_and_filling_of_employment_contracts_for_transfer_to_another_job),
+    13: ("filling_notifications", filling_notifications),
+    15: ("formation_reduction_notification", formation_reduction_notification),
+    17: ("get_missing_ids", get_missing_ids),
+    18: ("address_parsing", address_parsing),
+    20: ("ditional_agreement_health_reasons_agreement_health", filling_ditional_agreement_health_reasons_agreement_health),
+    # Уведомления на сокращение одним файлом для печати
+    21: ("formation_reduction_notification_merged", lambda: formation_reduction_notification(merged=True)),
+}
+
+
 @app.post("/action", response_class=HTMLResponse)
 async def action(request: Request, user_input: str = Form(...)):
     """Выполнение действий"""
     logger.info(f"Выбранное действие: {user_input}")
     try:
         user_input = int(user_input)
-        if user_input == 1:  # Парсинг данных из файла Excel
-            await parsing_document_1(min_row=5, max_row=1084, column=5, column_1=8)
-        elif user_input == 2:  # Формирование трудовых договоров
-            await formation_employment_contracts_filling_data()
-        elif user_input == 3:  # Сравнение и перезапись значений профессии в файле Excel счет начинается с 0
-            await compare_and_rewrite_professions()
+        if user_input in BACKGROUND_ACTIONS:  # Длительная задача: ставим в очередь и сразу отвечаем
+            if user_input == 18:
+                logger.info("Пользователь запустил (Парсинг адресов для конверта)")
+            job_type, func = BACKGROUND_ACTIONS[user_input]
+            job = job_queue.submit(job_type, func)
+            return JSONResponse(job.to_dict(), status_code=202)
+
         elif user_input == 4:
             return RedirectResponse(url="/import_excel_form", status_code=303)
 
@@ -215,37 +384,104 @@ async def action(request: Request, user_input: str = Form(...)):
             return RedirectResponse(url="/", status_code=303)
         elif user_input == 7:  # Очистка базы данных
             await database_cleaning_function(templates, request)
-        elif user_input == 8:  # Заполнение договоров на простой
-            await formation_and_filling_of_employment_contracts_for_idle_time_enterprise()
-        elif user_input == 9:  # Заполнение договоров на не полную рабочую неделю
-            await formation_and_filling_of_part_time_employment_contracts()
-        elif user_input == 10:  # Дополнительное соглашение по состоянию здоровья
-            await filling_ditional_agreement_health_reasons()
-        elif user_input == 11:  # Дополнительное соглашение на перевод на другую должность (профессию)
-            await formation_and_filling_of_employment_contracts_for_transfer_to_another_job()
         elif user_input == 12:  # Переход для формирования трудовых договоров и дополнительных соглашений
             return RedirectResponse(url="/formation_employment_contracts", status_code=303)
-        elif user_input == 13:  # Переход для парсинга данных из файла
-            await filling_notifications()  # Заполнение уведомлений для сотрудников
-        elif user_input == 15:  # Формирование уведомление о сокращении
-            await formation_reduction_notification()
-        elif user_input == 17:  # Сверка уведомлений
-            await get_missing_ids()
-
-        elif user_input == 18:  # Парсинг адресов для конверта
-            logger.info("Пользователь запустил (Парсинг адресов для конверта)")
-            await address_parsing()
         elif user_input == 19:  # Формирование уведомления на сокращение
             return RedirectResponse(url="/notification_compression", status_code=303)
 
-        elif user_input == 20:  # Заполнение дополнительного соглашения
-            await filling_ditional_agreement_health_reasons_agreement_health()
-
         return RedirectResponse(url="/", status_code=303)
     except Exception as e:
         logger.exception(e)
         raise HTTPException(status_code=500, detail="Произошла ошибка.")
 
 
+@app.get("/jobs")
+async def jobs_list():
+    """Список фоновых задач"""
+    return JSONResponse([job.to_dict() for job in job_queue.list()])
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """Состояние фоновой задачи"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    return JSONResponse(job.to_dict())
+
+
+@app.get("/jobs/{job_id}/progress")
+async def job_progress(job_id: str):
+    """Лента прогресса задачи (Server-Sent Events): строки, скорость, оставшееся время, ошибки строк"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+
+    async def events():
+        while True:
+            data = job.to_dict()
+            yield f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+            if data["status"] in ("done", "error"):
+                yield "event: end\ndata: {}\n\n"
+                return
+            await asyncio.sleep(1)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.get("/jobs/{job_id}/download")
+async def job_download(job_id: str):
+    """Файл, сформированный задачей (например, Excel с исправленными профессиями)"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    download = job.result.get("download") if job.status == "done" and isinstance(job.result, dict) else None
+    if download is None or not os.path.isfile(download):
+        raise HTTPException(status_code=404, detail="Файл задачи не найден")
+    return FileResponse(download, filename=original_name(download))
+
+
+# Пакеты документов, которые можно получить одним ZIP архивом (номера действий из BACKGROUND_ACTIONS)
+ARCHIVE_ACTIONS = (2, 8, 9, 10, 11, 13, 15, 20)
+
+
+@app.get("/download_archive/{action_id}")
+async def download_archive(action_id: int):
+    """
+    Пакет документов одним ZIP архивом. Архив отдается по мере рендеринга, документы на диск не записываются.
+    Формирование идет фоновой задачей, ее прогресс доступен по /jobs/{job_id}/progress (заголовок X-Job-Id).
+    """
+    if action_id not in ARCHIVE_ACTIONS:
+        raise HTTPException(status_code=404, detail="Для этого действия архив не формируется")
+    job_type, func = BACKGROUND_ACTIONS[action_id]
+    job_type = f"{job_type}_archive"
+    if job_queue.active(job_type) is not None:
+        raise HTTPException(status_code=409, detail="Архив этого пакета уже формируется")
+
+    stream = ArchiveStream()
+
+    async def build_archive():
+        try:
+            result = await func(archive=stream)
+        except BaseException as e:
+            stream.fail(e)  # Ответ прерывается, клиент не получает неполный архив как успешный
+            raise
+        stream.close()
+        return result
+
+    job = job_queue.submit(job_type, build_archive)
+    # Ответ начинается только после первого фрагмента архива: ошибка до начала записи возвращается кодом 500
+    chunks = iter(stream)
+    try:
+        first = await asyncio.to_thread(next, chunks, None)
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return StreamingResponse(
+        itertools.chain([first] if first is not None else [], chunks),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{job_type}.zip"', "X-Job-Id": job.id},
+    )
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host="127.0.0.1", port=8000, log_level="info")
\ No newline at end of file
@@ -23,42 +23,21 @@ async def address_parsing():
 
     logger.info("Парсинг адреса")
 
-    rows = await read_from_db()
+    # Сотрудники из списка "адреса" (по умолчанию - datas), отобранные запросом к базе данных
+    rows = await read_from_db(target_list="адреса")
 
-    if not rows:
-        logger.warning("Нет данных из БД")
-        return []
-
-    data = []
     matches = []
 
     for row in rows:
-        raw_tab_num = row.a4_табельный_номер
-
-        # Логируем "как есть"
-        logger.debug(f"Raw табельный номер: {raw_tab_num}, тип: {type(raw_tab_num)}")
-
-        # Преобразуем в int с обработкой ошибок
-        try:
-            tab_num = int(str(raw_tab_num).strip())
-        except (ValueError, AttributeError, TypeError):
-            logger.warning(f"Пропущено: не удалось обработать табельный номер '{raw_tab_num}'")
-            continue
-
         # сохраняем данные как словарь
         entry = {
-            "табельный": tab_num,
+            "табельный": row.tab_number,
             "a5": row.a5,
             "a13": row.a13
         }
-        data.append(entry)
-
-        # проверяем совпадение
-        if tab_num in datas:
-            matches.append(entry)
-            logger.debug(f"Найдено совпадение: {entry}")
+        matches.append(entry)
+        logger.debug(f"Найдено совпадение: {entry}")
 
-    logger.info(f"Всего записей: {len(data)}")
     logger.info(f"Совпадений найдено: {len(matches)}")
 
     # Сохраняем в Word
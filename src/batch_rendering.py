@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+import configparser
+import io
+import os
+import queue
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from loguru import logger
+
+from src.template_cache import get_template, templated_parts
+
+config_file = "data/config.ini"  # Файл настроек программы
+ARCHIVE_STREAM_CHUNKS = 64  # Сколько фрагментов архива может ждать отправки клиенту
+PAGE_BREAK = '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'  # Разрыв страницы между документами общего файла
+
+
+def get_workers():
+    """Количество процессов для рендеринга из data/config.ini (0 или отсутствие настройки - по числу ядер)"""
+    config = configparser.ConfigParser()
+    config.read(config_file, encoding="utf-8")
+    workers = config.getint("batch", "workers", fallback=0)
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def render_document(job):
+    """
+    Рендеринг одного документа по заданию
+
+    Args:
+        job: словарь с ключами file_dog (шаблон), context (данные), output_path и filename
+
+    Returns:
+        str: полный путь к сохраненному документу
+    """
+    doc = get_template(job["file_dog"])  # Копия шаблона из кэша процесса
+    doc.render(job["context"])  # Рендеринг документа
+    full_path = f"{job['output_path']}/{job['filename']}"
+    doc.save(full_path)  # Сохранение документа
+    return full_path
+
+
+def render_document_bytes(job):
+    """Рендеринг одного документа в память (без записи на диск)"""
+    doc = get_template(job["file_dog"])
+    doc.render(job["context"])
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def archive_name(job):
+    """Имя документа внутри архива: папка вывода пакета и имя файла"""
+    return f"{os.path.basename(job['output_path'].rstrip('/'))}/{job['filename']}"
+
+
+def _render_job(job):
+    """Рендеринг документа в процессе пула. Ошибка строки не прерывает пакет, а попадает в манифест"""
+    try:
+        return manifest_entry(job, path=render_document(job))
+    except Exception as e:
+        return manifest_entry(job, error=e)
+
+
+def _render_job_bytes(job):
+    """Рендеринг документа в память в процессе пула: (запись манифеста, содержимое документа или None)"""
+    try:
+        return manifest_entry(job, path=archive_name(job)), render_document_bytes(job)
+    except Exception as e:
+        return manifest_entry(job, error=e), None
+
+
+def manifest_entry(job, path=None, error=None):
+    """Запись манифеста пакета для одной строки"""
+    return {
+        "tab_number": job.get("tab_number"),
+        "name": job.get("name"),
+        "file_dog": job.get("file_dog"),
+        "path": path,
+        "ok": error is None,
+        "error": None if error is None else str(error),
+    }
+
+
+def render_batch(jobs, workers=None, progress=None):
+    """
+    Параллельный рендеринг пакета документов в пуле процессов
+
+    Args:
+        jobs: список заданий (см. render_document)
+        workers: количество процессов, по умолчанию из data/config.ini
+        progress: прогресс задачи (src.progress.Progress), обновляется по каждой строке
+
+    Returns:
+        list: манифест - по одной записи на задание в исходном порядке
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return []
+    return _collect(_run_jobs(_render_job, jobs, workers), progress)
+
+
+def render_batch_to_archive(jobs, archive, workers=None, progress=None):
+    """
+    Рендеринг пакета документов сразу в один ZIP архив, без промежуточных файлов
+
+    Args:
+        jobs: список заданий (см. render_document)
+        archive: путь к архиву или файловый объект для записи (например ArchiveStream)
+        workers: количество процессов, по умолчанию из data/config.ini
+        progress: прогресс задачи (src.progress.Progress), обновляется по каждой строке
+
+    Returns:
+        list: манифест; path - имя документа внутри архива
+    """
+    jobs = list(jobs)
+    manifest = []
+    # .docx уже сжат, поэтому документы добавляются без повторного сжатия
+    with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_STORED) as zf:
+        if jobs:
+            for entry, data in _run_jobs(_render_job_bytes, jobs, workers):
+                if data is not None:
+                    zf.writestr(entry["path"], data)
+                manifest.append(entry)
+                if progress is not None:
+                    progress.advance(entry)
+    return manifest
+
+
+def merged_path(job):
+    """Общий документ пакета: по одному на шаблон в папке вывода пакета"""
+    template = os.path.splitext(os.path.basename(job["file_dog"]))[0]
+    return f"{job['output_path']}/Пакет_{template}.docx"
+
+
+def render_batch_merged(jobs, workers=None, progress=None):
+    """
+    Рендеринг пакета в общие документы для печати: каждая строка - отдельные страницы одного файла.
+    Документы дописываются в файл по мере рендеринга, в памяти держится только текущий документ.
+    Строки с разными шаблонами попадают в разные общие документы (см. merged_path).
+    Колонтитулы и сноски общего документа берутся из первого документа, поэтому строки шаблонов
+    с переменными вне тела документа формируются отдельными файлами, как в обычном пакете.
+
+    Args:
+        jobs: список заданий (см. render_document)
+        workers: количество процессов, по умолчанию из data/config.ini
+        progress: прогресс задачи (src.progress.Progress), обновляется по каждой строке
+
+    Returns:
+        list: манифест; path - общий документ, в который попала строка, или отдельный документ
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return []
+    mergeable, separate = split_mergeable(jobs)
+    manifest = []
+    documents = {}  # путь общего документа -> MergedDocument
+    try:
+        if mergeable:
+            for job, (entry, data) in zip(mergeable, _run_jobs(_render_job_bytes, mergeable, workers)):
+                if data is not None:
+                    path = merged_path(job)
+                    try:
+                        document = documents.get(path)
+                        if document is None:
+                            document = documents[path] = MergedDocument(path)
+                        document.append(data)
+                        entry["path"] = path
+                    except Exception as e:
+                        entry = manifest_entry(job, error=e)
+                manifest.append(entry)
+                if progress is not None:
+                    progress.advance(entry)
+    finally:
+        for document in documents.values():
+            document.close()
+    for path, document in documents.items():
+        logger.info(f"Общий документ: {path}, документов: {document.count}")
+    if separate:
+        manifest.extend(_collect(_run_jobs(_render_job, separate, workers), progress))
+    return manifest
+
+
+def split_mergeable(jobs):
+    """
+    Разделение заданий на те, что можно объединить в общий документ, и те, что формируются отдельными файлами:
+    шаблоны с переменными в колонтитулах или сносках дали бы всем страницам значения первой строки
+
+    Returns:
+        tuple: (задания для общего документа, задания для отдельных файлов)
+    """
+    mergeable, separate = [], []
+    blocked = {}  # шаблон -> части с переменными
+    for job in jobs:
+        path = job["file_dog"]
+        if path not in blocked:
+            try:
+                blocked[path] = templated_parts(path)
+            except Exception:
+                blocked[path] = ()  # Ошибка чтения шаблона попадет в манифест строки при рендеринге
+            if blocked[path]:
+                logger.warning(
+                    f"Шаблон {path} содержит переменные вне тела документа ({', '.join(blocked[path])}): "
+                    f"документы формируются отдельными файлами, а не в общий документ"
+                )
+        (separate if blocked[path] else mergeable).append(job)
+    return mergeable, separate
+
+
+def _run_jobs(func, jobs, workers):
+    """Выполнение заданий в пуле процессов, результаты выдаются в исходном порядке по мере готовности"""
+    workers = min(workers or get_workers(), len(jobs))
+    logger.info(f"Рендеринг {len(jobs)} документов, процессов: {workers}")
+
+    if workers <= 1:
+        yield from map(func, jobs)
+        return
+
+    # Задания раздаются пачками, чтобы каждый процесс переиспользовал свой кэш шаблонов
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(func, jobs, chunksize=chunksize)
+
+
+def _collect(entries, progress):
+    """Сбор манифеста с обновлением прогресса по мере готовности строк"""
+    manifest = []
+    for entry in entries:
+        manifest.append(entry)
+        if progress is not None:
+            progress.advance(entry)
+    return manifest
+
+
+def log_manifest(manifest):
+    """Итоги пакета по манифесту"""
+    errors = [entry for entry in manifest if not entry["ok"]]
+    skipped = sum(1 for entry in manifest if entry.get("skipped"))
+    logger.info(f"Сформировано документов: {len(manifest) - len(errors) - skipped}")
+    if skipped:
+        logger.info(f"Без изменений (не формировались повторно): {skipped}")
+    logger.info(f"Ошибок: {len(errors)}")
+    for entry in errors:
+        logger.error(f"Табельный номер {entry['tab_number']} ({entry['name']}): {entry['error']}")
+
+
+class ArchiveStream:
+    """
+    Поток архива для отдачи клиенту по мере формирования: задача пишет фрагменты, ответ HTTP их читает.
+    Если клиент отключился, запись прерывается ошибкой, и задача не зависает на заполненной очереди.
+    Ошибка задачи передается читателю (fail) и прерывает ответ, а не завершает его неполным архивом.
+    """
+
+    def __init__(self, max_chunks=ARCHIVE_STREAM_CHUNKS):
+        self._chunks = queue.Queue(maxsize=max_chunks)
+        self._abandoned = False
+
+    def _put(self, item):
+        """Передача фрагмента читателю; False, если читатель уже отключился"""
+        while not self._abandoned:
+            try:
+                self._chunks.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def write(self, data):
+        data = bytes(data)
+        if not self._put(data):
+            raise BrokenPipeError("Клиент прервал загрузку архива")
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        """Конец архива (вызывается задачей после успешного формирования)"""
+        self._put(None)
+
+    def fail(self, error):
+        """Ошибка задачи: читатель получит ее вместо конца архива"""
+        self._put(error)
+
+    def __iter__(self):
+        try:
+            while True:
+                chunk = self._chunks.get()
+                if chunk is None:
+                    return
+                if isinstance(chunk, BaseException):
+                    raise RuntimeError(f"Архив не сформирован: {chunk}") from chunk
+                yield chunk
+        finally:
+            self._abandoned = True
+
+
+class MergedDocument:
+    """
+    Общий документ .docx, дописываемый по одному документу: тело каждого документа добавляется
+    в word/document.xml через разрыв страницы. Остальные части (стили, колонтитулы) берутся из первого документа,
+    поэтому в один общий документ попадают только документы одного шаблона.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._zip = None
+        self._body = None  # Поток записи word/document.xml
+        self._tail = None  # Свойства раздела и закрытие тела документа
+
+    def append(self, data):
+        """Добавление отрендеренного документа (содержимое .docx)"""
+        with zipfile.ZipFile(io.BytesIO(data)) as source:
+            xml = source.read("word/document.xml").decode("utf-8")
+            start = xml.index(">", xml.index("<w:body")) + 1
+            end = xml.rindex("</w:body>")
+            section = xml.rfind("<w:sectPr", start, end)
+            if section != -1 and "</w:p>" not in xml[section:end]:
+                end = section  # Свойства раздела тела документа пишутся один раз в конце
+            if self._zip is None:
+                self._zip = zipfile.ZipFile(self.path, "w", compression=zipfile.ZIP_DEFLATED)
+                for item in source.infolist():
+                    if item.filename != "word/document.xml":
+                        self._zip.writestr(item, source.read(item.filename))
+                self._body = self._zip.open("word/document.xml", "w", force_zip64=True)
+                self._body.write(xml[:start].encode("utf-8"))
+                self._tail = xml[end:]
+            else:
+                self._body.write(PAGE_BREAK.encode("utf-8"))
+            self._body.write(xml[start:end].encode("utf-8"))
+        self.count += 1
+
+    def close(self):
+        if self._zip is None:
+            return
+        self._body.write(self._tail.encode("utf-8"))
+        self._body.close()
+        self._zip.close()
+        self._zip = None
@@ -1,13 +1,61 @@
 # -*- coding: utf-8 -*-
-import openpyxl as op
+import asyncio
+import os
+import sqlite3
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
 from loguru import logger
 from peewee import *
+from playhouse.migrate import SqliteMigrator, migrate
+from playhouse.pool import PooledSqliteDatabase
+
+from src.date_format import parse_date
+from src.excel_reader import iter_rows
+
+DB_MAX_CONNECTIONS = 16  # Максимум открытых подключений в пуле
+DB_STALE_TIMEOUT = 300  # Подключение, простоявшее в пуле дольше (секунд), закрывается
+DB_CACHED_STATEMENTS = 256  # Подготовленные запросы, кэшируемые в каждом подключении
+LEGACY_PROFESSIONS_DB = "data/data.db"  # Прежняя отдельная база соответствий профессий (таблица parsing)
+
+# Единая база данных программы: сотрудники, списки табельных номеров, соответствия профессий, манифест документов.
+# Подключение у каждого потока свое, закрытие возвращает его в пул. Подключения пула живут долго, поэтому
+# подготовленные запросы переиспользуются из кэша подключения (cached_statements).
+# WAL: чтение не блокируется записью, busy_timeout: запись ждет освобождения базы вместо ошибки "database is locked"
+db = PooledSqliteDatabase(
+    "data/contracts.db",
+    max_connections=DB_MAX_CONNECTIONS,
+    stale_timeout=DB_STALE_TIMEOUT,
+    pragmas={"journal_mode": "wal", "synchronous": "normal", "busy_timeout": 5000, "foreign_keys": 1},
+    check_same_thread=False,
+    cached_statements=DB_CACHED_STATEMENTS,
+)
+
+
+@contextmanager
+def connection():
+    """
+    Подключение текущего потока к базе данных. Уже открытое подключение переиспользуется,
+    закрывается (возвращается в пул) только тем, кто его открыл - вложенные вызовы безопасны.
+    При первом подключении процесса создаются таблицы и обновляется схема (migrate_database).
+    """
+    opened = db.connect(reuse_if_open=True)
+    try:
+        migrate_database()
+        yield db
+    finally:
+        if opened:
+            db.close()
 
-from src.get import Employee
 
-# Настройка базы данных через Peewee
-db = SqliteDatabase("data/contracts.db")
+async def run_query(func, *args, **kwargs):
+    """Выполнение функции работы с базой данных в пуле потоков, не блокируя цикл событий"""
+    def call():
+        with connection():
+            return func(*args, **kwargs)
 
+    return await asyncio.to_thread(call)
 
 
 class Employee(Model):
@@ -46,58 +94,482 @@ class Employee(Model):
     a32 = CharField(null=True)
     a33 = CharField(null=True)
     a34 = CharField(null=True)
+    tab_number = IntegerField(null=True, unique=True)  # Табельный номер числом (a4), уникальный индекс
+    salary = FloatField(null=True)  # Оклад или часовая тарифная ставка числом (a9)
+    hire_date = DateField(null=True)  # Дата поступления на предприятие (a7)
 
     class Meta:
         database = db  # Указываем, что модель будет использовать нашу базу данных
 
 
+# Поля записи сотрудника в порядке колонок таблицы: a0...a34, затем типизированные tab_number, salary, hire_date
+RECORD_FIELDS = tuple(field.name for field in Employee._meta.sorted_fields if field is not Employee._meta.primary_key)
+
+
+class EmployeeRecord:
+    """
+    Компактная запись сотрудника для пакетной обработки: колонки списочного состава (a0...a34) и уже разобранные
+    при импорте табельный номер (int), оклад (float) и дата поступления (date)
+    """
+
+    __slots__ = RECORD_FIELDS
+
+    def __init__(self, values):
+        for name, value in zip(RECORD_FIELDS, values):
+            setattr(self, name, value)
+
+
+class EmployeeStaging(Employee):
+    """Промежуточная таблица импорта: новый списочный состав загружается сюда и затем подменяет Employee"""
+
+    class Meta:
+        table_name = "employee_staging"
+
+
+class TargetList(Model):
+    """Списки табельных номеров, для которых формируются отдельные документы (простой, перевод и т.д.)"""
+    list_name = CharField()  # Название списка
+    tab_number = IntegerField()  # Табельный номер
+
+    class Meta:
+        database = db
+        indexes = ((("list_name", "tab_number"), True),)
+
+
+class TargetListName(Model):
+    """Существующие списки табельных номеров. Список может быть пустым, поэтому его наличие хранится отдельно"""
+    list_name = CharField(unique=True)  # Название списка
+
+    class Meta:
+        database = db
+        table_name = "target_list_name"
+
+
+class RenderedDocument(Model):
+    """Сформированные документы: хеши данных и шаблона, по которым повторный запуск пропускает неизмененные строки"""
+    path = CharField(unique=True)  # Путь к сформированному документу
+    context_hash = CharField()  # sha256 данных, подставленных в шаблон
+    template_hash = CharField()  # sha256 файла шаблона
+    rendered = DateTimeField()  # Время формирования
+
+    class Meta:
+        database = db
+
+
+class ProfessionMapping(Model):
+    """Соответствие табельного номера и профессии для сверки профессий в файле Excel"""
+    tab_number = CharField()  # Табельный номер (значение колонки Excel строкой)
+    profession = CharField(null=True)  # Профессия
+
+    class Meta:
+        database = db
+        table_name = "profession_mapping"
+        indexes = ((("tab_number", "profession"), True),)
+
+
+EXCEL_COLUMNS = 35  # Колонки списочного состава A–AI соответствуют полям a0...a34
+
+# Количество строк в одном INSERT: 38 полей * 26 строк укладываются в лимит 999 параметров SQLite
+IMPORT_CHUNK_SIZE = 26
+# Поля, которые ведет программа (a31 - статус "напечатанный"): при обновлении сотрудника значение из базы данных
+# сохраняется, если ячейка в файле пустая
+DERIVED_FIELDS = ("a31",)
+
+
+def parse_tab_number(value):
+    """Приведение табельного номера к целому числу. None, если номер не распознан"""
+    try:
+        return int(float(str(value).strip()))
+    except (ValueError, TypeError):
+        return None
+
+
+def parse_salary(value):
+    """Оклад или тарифная ставка числом. None, если значение не распознано"""
+    try:
+        return float(str(value).strip().replace(",", "."))
+    except (ValueError, TypeError):
+        return None
+
+
+_schema_ready = False  # Схема проверяется и обновляется один раз за процесс
+
+
+def migrate_database():
+    """
+    Создание таблиц и обновление схемы существующей базы data/contracts.db:
+    добавление колонки tab_number, ее заполнение по a4_табельный_номер и уникальный индекс,
+    добавление и заполнение колонок salary и hire_date, перенос соответствий профессий из прежней базы data/data.db
+    """
+    global _schema_ready
+    if _schema_ready:
+        return
+    table = Employee._meta.table_name
+    if db.table_exists(table) and "tab_number" not in {column.name for column in db.get_columns(table)}:
+        logger.info("Обновление схемы базы данных: добавление колонки tab_number")
+        migrator = SqliteMigrator(db)
+        with db.atomic():
+            migrate(migrator.add_column(table, "tab_number", IntegerField(null=True)))
+            seen = set()
+            for pk, raw in Employee.select(Employee.id, Employee.a4_табельный_номер).tuples():
+                tab_number = parse_tab_number(raw)
+                if tab_number is None or tab_number in seen:
+                    continue
+                seen.add(tab_number)
+                Employee.update(tab_number=tab_number).where(Employee.id == pk).execute()
+            migrate(migrator.add_index(table, ("tab_number",), unique=True))
+    if db.table_exists(table) and "salary" not in {column.name for column in db.get_columns(table)}:
+        logger.info("Обновление схемы базы данных: добавление колонок salary и hire_date")
+        migrator = SqliteMigrator(db)
+        with db.atomic():
+            migrate(
+                migrator.add_column(table, "salary", FloatField(null=True)),
+                migrator.add_column(table, "hire_date", DateField(null=True)),
+            )
+            for pk, salary, hire_date in Employee.select(Employee.id, Employee.a9, Employee.a7).tuples():
+                Employee.update(salary=parse_salary(salary), hire_date=parse_date(hire_date)).where(
+                    Employee.id == pk).execute()
+    list_names_exist = db.table_exists(TargetListName._meta.table_name)
+    db.create_tables([Employee, TargetList, TargetListName, ProfessionMapping, RenderedDocument], safe=True)
+    if not list_names_exist:
+        # Списки, созданные до появления таблицы названий, считаются существующими
+        names = TargetList.select(TargetList.list_name).distinct()
+        TargetListName.insert_from(names, [TargetListName.list_name]).on_conflict_ignore().execute()
+    migrate_legacy_professions()
+    _schema_ready = True
+
+
+def migrate_legacy_professions():
+    """Перенос соответствий профессий из data/data.db, если в общей базе их еще нет"""
+    if not os.path.exists(LEGACY_PROFESSIONS_DB) or ProfessionMapping.select().exists():
+        return
+    legacy = sqlite3.connect(LEGACY_PROFESSIONS_DB)
+    try:
+        pairs = legacy.execute("SELECT table_column_1, table_column_2 FROM parsing").fetchall()
+    except sqlite3.DatabaseError as e:
+        logger.warning(f"Не удалось прочитать {LEGACY_PROFESSIONS_DB}: {e}")
+        return
+    finally:
+        legacy.close()
+    replace_profession_mapping(pairs)
+    logger.info(f"Соответствия профессий перенесены из {LEGACY_PROFESSIONS_DB}: {len(pairs)}")
+
+
+def with_typed_columns(rows, seen=None):
+    """
+    Добавление к строкам Excel разобранных один раз табельного номера, оклада и даты поступления.
+    Повторный табельный номер не индексируется, пустые строки (в том числе только отформатированные) пропускаются -
+    одинаково для всех способов импорта
+
+    Args:
+        rows: строки Excel
+        seen: табельные номера, уже занятые в базе данных
+    """
+    seen = set() if seen is None else seen
+    for row in rows:
+        if all(value is None for value in row[:EXCEL_COLUMNS]):
+            continue  # Пустая строка
+        tab_number = parse_tab_number(row[4])
+        if tab_number in seen:
+            logger.warning(f"Повторяющийся табельный номер {tab_number}: строка импортируется без индекса")
+            tab_number = None
+        elif tab_number is not None:
+            seen.add(tab_number)
+        yield tuple(row[:EXCEL_COLUMNS]) + (tab_number, parse_salary(row[9]), parse_date(row[7]))
+
+
 # Функция для импорта данных из Excel в базу данных
-async def import_excel_to_db(min_row, max_row, file):
-
-    wb = op.load_workbook(file)
-    ws = wb.active
-
-    # Подключаемся к базе данных и создаем таблицу, если она не существует
-    db.connect()
-    db.create_tables([Employee], safe=True)
-
-    # Импортируем данные
-    for row in ws.iter_rows(min_row=min_row, max_row=max_row, min_col=0, max_col=40):
-        row_data = [cell.value for cell in row]
-
-        # Создаем запись в базе данных
-        Employee.create(
-            a0=row_data[0], a1=row_data[1], a2=row_data[2], a3=row_data[3],
-            a4_табельный_номер=row_data[4], a5=row_data[5], a6=row_data[6],
-            a7=row_data[7], a8=row_data[8], a9=row_data[9], a10=row_data[10],
-            a11=row_data[11], a12=row_data[12], a13=row_data[13], a14=row_data[14],
-            a15=row_data[15], a16=row_data[16], a17=row_data[17], a18=row_data[18],
-            a19=row_data[19], a20=row_data[20], a21=row_data[21], a22=row_data[22],
-            a23=row_data[23], a24=row_data[24], a25_номер_договора=row_data[25],
-            a26=row_data[26], a27=row_data[27], a28=row_data[28], a29=row_data[29],
-            a30=row_data[30], a31=row_data[31], a32=row_data[32], a33=row_data[33],
-            a34=row_data[34],
+async def import_excel_to_db(min_row, max_row, file, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Импорт строк Excel в базу данных одной транзакцией, пачками по chunk_size строк (в пуле потоков)
+
+    Args:
+        min_row: первая строка диапазона
+        max_row: последняя строка диапазона
+        file: путь к файлу Excel
+        chunk_size: количество строк в одном INSERT
+    """
+    await run_query(import_rows, min_row, max_row, file, chunk_size)
+
+
+def import_rows(min_row, max_row, file, chunk_size=IMPORT_CHUNK_SIZE):
+    """Импорт строк Excel в базу данных (синхронно, в подключении текущего потока)"""
+    start = time.perf_counter()
+
+    # Порядок полей модели совпадает с порядком колонок Excel (a0...a34), затем tab_number, salary, hire_date
+    fields = [field for field in Employee._meta.sorted_fields if field is not Employee._meta.primary_key]
+    excel_rows = iter_rows(file, min_row=min_row, max_row=max_row, max_col=40)
+
+    with connection():  # Таблицы создаются (обновляются) при подключении
+        existing = {
+            tab for tab, in Employee.select(Employee.tab_number).where(Employee.tab_number.is_null(False)).tuples()
+        }
+        rows = list(with_typed_columns(excel_rows, seen=existing))
+
+        # Импортируем данные одной транзакцией
+        with db.atomic():
+            for batch in chunked(rows, chunk_size):
+                Employee.insert_many(batch, fields=fields).execute()
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"Данные из Excel импортированы в базу данных: {len(rows)} строк за {elapsed:.2f} с "
+        f"({len(rows) / elapsed:.0f} строк/с)."
+    )
+
+
+def replace_employees(file, min_row, max_row=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Замена всех сотрудников строками файла Excel через промежуточную таблицу employee_staging.
+    Строки читаются потоково и пачками пишутся в промежуточную таблицу, затем одной короткой транзакцией
+    подменяют содержимое Employee. До подмены запросы к Employee видят прежний состав (WAL),
+    при ошибке чтения файла прежний состав остается без изменений.
+
+    Args:
+        file: путь к файлу Excel
+        min_row: первая строка диапазона
+        max_row: последняя строка диапазона (None - до последней заполненной строки)
+        chunk_size: количество строк в одном INSERT
+
+    Returns:
+        int: количество импортированных строк
+    """
+    start = time.perf_counter()
+    staging_fields = [getattr(EmployeeStaging, name) for name in RECORD_FIELDS]
+    fields = [getattr(Employee, name) for name in RECORD_FIELDS]
+    rows = with_typed_columns(iter_rows(file, min_row=min_row, max_row=max_row, max_col=40))
+
+    with connection():
+        db.drop_tables([EmployeeStaging], safe=True)  # Остатки прерванного импорта
+        db.create_tables([EmployeeStaging])
+        try:
+            count = 0
+            for batch in chunked(rows, chunk_size):
+                # Каждая пачка - отдельная короткая транзакция, другие задачи могут писать в базу между пачками
+                with db.atomic():
+                    EmployeeStaging.insert_many(batch, fields=staging_fields).execute()
+                count += len(batch)
+            with db.atomic():  # Подмена состава
+                Employee.delete().execute()
+                Employee.insert_from(EmployeeStaging.select(*staging_fields), fields).execute()
+        finally:
+            db.drop_tables([EmployeeStaging], safe=True)
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"Списочный состав заменен: {count} строк за {elapsed:.2f} с")
+    return count
+
+
+def sync_employees(file, min_row, max_row=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Обновление сотрудников по файлу Excel разницей по табельному номеру: новые номера добавляются,
+    измененные строки обновляются, отсутствующие в файле удаляются - одной транзакцией. Неизмененные строки
+    не перезаписываются, статус из DERIVED_FIELDS не теряется.
+    Строки без табельного номера (нераспознанный или повторный номер - при импорте такие строки хранятся
+    без индекса) сопоставляются со строками базы без табельного номера по содержимому: совпавшие остаются
+    без изменений, остальные добавляются или удаляются и тоже попадают в отчет.
+
+    Args:
+        file: путь к файлу Excel
+        min_row: первая строка диапазона
+        max_row: последняя строка диапазона (None - до последней заполненной строки)
+        chunk_size: количество строк в одном INSERT
+
+    Returns:
+        dict: отчет об изменениях - inserted и deleted (табельные номера), updated (табельный номер -> измененные
+        поля), inserted_without_tab_number и deleted_without_tab_number (id, табельный номер из колонки E и ФИО),
+        unchanged (количество)
+    """
+    start = time.perf_counter()
+    fields = [getattr(Employee, name) for name in RECORD_FIELDS]
+    key = RECORD_FIELDS.index("tab_number")
+    derived = [RECORD_FIELDS.index(name) for name in DERIVED_FIELDS]
+
+    def content(values):
+        """Строка без полей, которые ведет программа, для сопоставления строк без табельного номера"""
+        return tuple(value for index, value in enumerate(values) if index not in derived)
+
+    def describe(values, pk=None):
+        """Строка без табельного номера в отчете"""
+        return {"id": pk, "tab_number": values[RECORD_FIELDS.index("a4_табельный_номер")],
+                "name": values[RECORD_FIELDS.index("a5")]}
+
+    incoming, untracked = {}, []
+    for values in with_typed_columns(iter_rows(file, min_row=min_row, max_row=max_row, max_col=40)):
+        # Значения в том виде, в каком они читаются из базы данных (числа в текстовых колонках - строками)
+        values = tuple(field.python_value(field.db_value(value)) for field, value in zip(fields, values))
+        if values[key] is None:
+            untracked.append(values)  # Нераспознанный или повторный табельный номер
+        else:
+            incoming[values[key]] = values
+
+    report = {
+        "inserted": [], "updated": {}, "deleted": [], "unchanged": 0,
+        "inserted_without_tab_number": [], "deleted_without_tab_number": [],
+    }
+    with connection():
+        with db.atomic():
+            current = {}  # табельный номер -> (id, значения полей)
+            orphans = defaultdict(list)  # содержимое строки без табельного номера -> [(id, значения полей)]
+            for pk, *values in Employee.select(Employee.id, *fields).order_by(Employee.id).tuples():
+                if values[key] is None:
+                    orphans[content(values)].append((pk, tuple(values)))
+                else:
+                    current[values[key]] = (pk, tuple(values))
+
+            inserts, updates = [], []
+            for tab_number, values in incoming.items():
+                if tab_number not in current:
+                    inserts.append(values)
+                    report["inserted"].append(tab_number)
+                    continue
+                pk, old = current[tab_number]
+                new = list(values)
+                for index in derived:
+                    if new[index] is None or str(new[index]).strip() == "":
+                        new[index] = old[index]
+                changed = [name for name, before, after in zip(RECORD_FIELDS, old, new) if before != after]
+                if changed:
+                    report["updated"][tab_number] = changed
+                    updates.append([field.db_value(value) for field, value in zip(fields, new)] + [pk])
+                else:
+                    report["unchanged"] += 1
+            for values in untracked:
+                matches = orphans.get(content(values))
+                if matches:
+                    matches.pop(0)  # Та же строка уже есть в базе данных
+                    report["unchanged"] += 1
+                else:
+                    inserts.append(values)
+                    report["inserted_without_tab_number"].append(describe(values))
+            report["deleted"] = [tab_number for tab_number in current if tab_number not in incoming]
+            deletes = [current[tab_number][0] for tab_number in report["deleted"]]
+            for pk, values in (orphan for matches in orphans.values() for orphan in matches):
+                deletes.append(pk)
+                report["deleted_without_tab_number"].append(describe(values, pk))
+
+            for batch in chunked(deletes, 500):
+                Employee.delete().where(Employee.id.in_(batch)).execute()
+            if updates:
+                assignments = ", ".join(f'"{field.column_name}" = ?' for field in fields)
+                db.cursor().executemany(
+                    f'UPDATE "{Employee._meta.table_name}" SET {assignments} WHERE "id" = ?', updates
+                )
+            for batch in chunked(inserts, chunk_size):
+                Employee.insert_many(batch, fields=fields).execute()
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"Сотрудники обновлены по файлу за {elapsed:.2f} с: добавлено {len(report['inserted'])}, "
+        f"изменено {len(report['updated'])}, удалено {len(report['deleted'])}, без изменений {report['unchanged']}, "
+        f"без табельного номера добавлено {len(report['inserted_without_tab_number'])}, "
+        f"удалено {len(report['deleted_without_tab_number'])}"
+    )
+    for tab_number, changed in report["updated"].items():
+        logger.info(f"Табельный номер {tab_number}: изменены поля {', '.join(changed)}")
+    for entry in report["deleted_without_tab_number"]:
+        logger.info(f"Удален сотрудник без табельного номера: {entry}")
+    return report
+
+
+def replace_target_list(list_name, tab_numbers):
+    """
+    Замена содержимого списка табельных номеров
+
+    Args:
+        list_name: название списка
+        tab_numbers: табельные номера
+    """
+    rows = [(list_name, tab_number) for tab_number in sorted(set(tab_numbers))]
+    with db.atomic():
+        TargetListName.insert(list_name=list_name).on_conflict_ignore().execute()
+        TargetList.delete().where(TargetList.list_name == list_name).execute()
+        for batch in chunked(rows, 400):
+            TargetList.insert_many(batch, fields=[TargetList.list_name, TargetList.tab_number]).execute()
+    logger.info(f"Список {list_name}: {len(rows)} табельных номеров")
+
+
+def replace_profession_mapping(pairs):
+    """
+    Замена соответствий табельных номеров и профессий одной транзакцией за один проход:
+    повторы отбрасываются в памяти, оставшиеся пары вставляются одним подготовленным запросом (executemany),
+    уникальный индекс (tab_number, profession) страхует от повторов через INSERT OR IGNORE
+
+    Args:
+        pairs: пары (табельный номер, профессия), можно генератором
+
+    Returns:
+        int: количество загруженных соответствий
+    """
+    unique_pairs = list(dict.fromkeys(pairs))  # Повторы убираются с сохранением порядка
+    table = ProfessionMapping._meta.table_name
+    with db.atomic():
+        ProfessionMapping.delete().execute()
+        db.cursor().executemany(
+            f'INSERT OR IGNORE INTO "{table}" ("tab_number", "profession") VALUES (?, ?)', unique_pairs
         )
+    logger.info(f"Соответствий профессий: {len(unique_pairs)}")
+    return len(unique_pairs)
+
+
+def read_profession_mapping():
+    """Пары (табельный номер, профессия) в порядке загрузки"""
+    query = ProfessionMapping.select(ProfessionMapping.tab_number, ProfessionMapping.profession)
+    return list(query.order_by(ProfessionMapping.id).tuples())
+
+
+def seed_target_lists(defaults):
+    """
+    Заполнение списков значениями по умолчанию. Заполняются только списки, которых еще нет в базе данных,
+    поэтому загруженный (в том числе пустой) список не перезаписывается
+
+    Args:
+        defaults: название списка -> табельные номера по умолчанию
+    """
+    existing = {name for name, in TargetListName.select(TargetListName.list_name).tuples()}
+    for list_name, tab_numbers in defaults.items():
+        if list_name not in existing:
+            replace_target_list(list_name, tab_numbers)
+
+
+def read_target_list(list_name):
+    """Табельные номера списка list_name; None, если списка нет в базе данных"""
+    if not TargetListName.select().where(TargetListName.list_name == list_name).exists():
+        return None
+    query = TargetList.select(TargetList.tab_number).where(TargetList.list_name == list_name)
+    return [tab_number for tab_number, in query.tuples()]
+
+
+async def read_from_db(target_list=None):
+    """
+    Функция для чтения данных из базы данных. Запрос выполняется в пуле потоков, строки возвращаются списком
+    (подключение закрывается только после чтения всех строк)
 
-    db.close()  # Закрываем подключение к базе данных
-    logger.info("Данные из Excel импортированы в базу данных.")
+    Args:
+        target_list: название списка табельных номеров; если задано - только сотрудники из списка
+    """
+    return await run_query(read_rows, target_list)
 
 
-async def read_from_db():
-    """Функция для чтения данных из базы данных. Считываем данные из базы данных"""
-    db.connect()
-    rows = Employee.select()  # Получаем все записи из таблицы employees
-    db.close()  # Закрываем подключение к базе данных
-    return rows
+def read_rows(target_list=None):
+    """Сотрудники из базы данных записями EmployeeRecord (синхронно, в подключении текущего потока)"""
+    with connection():
+        # Получаем все записи из таблицы employees кортежами, без создания экземпляров модели
+        rows = Employee.select(*[getattr(Employee, name) for name in RECORD_FIELDS])
+        if target_list is not None:
+            if not TargetListName.select().where(TargetListName.list_name == target_list).exists():
+                logger.warning(f"Списка {target_list} нет в базе данных, сотрудники не выбраны")
+            # Отбор одним запросом WHERE tab_number IN (...) по индексу
+            members = TargetList.select(TargetList.tab_number).where(TargetList.list_name == target_list)
+            rows = rows.where(Employee.tab_number.in_(members))
+        return [EmployeeRecord(values) for values in rows.tuples()]
 
 
 # Функция для очистки базы данных
 async def clear_database():
     """Удаляет все записи из таблицы Employee."""
     try:
-        db.connect()
-        deleted_count = Employee.delete().execute()
-        db.close()
+        deleted_count = await run_query(lambda: Employee.delete().execute())
         logger.info(f"База данных очищена. Удалено записей: {deleted_count}")
     except Exception as e:
         logger.exception("Ошибка при очистке базы данных: ", e)
@@ -117,4 +589,4 @@ async def database_cleaning_function(templates, request):
 
 
 if __name__ == "__main__":
-    clear_database()  # Очистка базы данных
+    asyncio.run(clear_database())  # Очистка базы данных
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+from datetime import date, datetime
+from functools import lru_cache
+
+DATE_FORMATS = ("%d.%m.%Y", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d")  # Форматы дат в ячейках, записанных текстом
+DATE_CACHE_SIZE = 4096  # Количество различных дат, хранимых в кэше разбора и форматирования
+EMPTY_DATE = "__.__.____"  # Подстановка, если дата не указана или не распознана
+EMPTY_DATE_PARTS = ("--", "--", "----")  # День, месяц и год, если дата не указана или не распознана
+
+# Названия месяцев в родительном падеже (индекс - номер месяца)
+MONTHS_GENITIVE = ("", "января", "февраля", "марта", "апреля", "мая", "июня", "июля", "августа", "сентября",
+                   "октября", "ноября", "декабря")
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _parse_text(text):
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_date(value):
+    """
+    Дата из значения ячейки Excel или базы данных: date, datetime (openpyxl) или текст (дд.мм.гггг и ISO).
+    Текст разбирается один раз для каждого различного значения.
+
+    Returns:
+        date | None: дата или None, если дата не указана или не распознана
+    """
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if value is None:
+        return None
+    return _parse_text(str(value).strip())
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _russian(day):
+    return '" {:02d} " {} {} г.'.format(day.day, MONTHS_GENITIVE[day.month], day.year)
+
+
+def format_russian_date(value, default=None):
+    """
+    Дата для документа: " 01 " января 2024 г. Для каждой различной даты строка формируется один раз.
+
+    Args:
+        value: дата (date, datetime или текст)
+        default: подстановка для пустой или нераспознанной даты; если не задана - ValueError
+
+    Raises:
+        ValueError: дата не указана или не распознана, а default не задан
+    """
+    day = parse_date(value)
+    if day is None:
+        if default is not None:
+            return default
+        raise ValueError(f"Дата не указана или не распознана: {value}")
+    return _russian(day)
+
+
+def date_parts(value):
+    """День, месяц и год строками (01, 02, 2024) для полей договора; прочерки, если дата не распознана"""
+    day = parse_date(value)
+    if day is None:
+        return EMPTY_DATE_PARTS
+    return f"{day.day:02d}", f"{day.month:02d}", str(day.year)
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+
+from loguru import logger
+
+from src.receipt_contract import iter_staff_rows
+
+
+def tab_key(value):
+    """Приведение табельного номера к ключу индекса (856, 856.0 и "856" дают один ключ)"""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+class EmployeeIndex:
+    """
+    Индекс строк списочного состава по табельному номеру, хранимый в памяти приложения.
+    При изменении файла (mtime) индекс перестраивается в фоновом потоке, до окончания
+    перестроения запросы обслуживаются по прежнему индексу.
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self._rows = None  # табельный номер -> строка Excel
+        self._mtime = None  # mtime файла, по которому построен индекс
+        self._lock = threading.Lock()
+        self._rebuild_thread = None
+
+    def _build(self):
+        """Построение индекса по файлу"""
+        mtime = os.stat(self.file).st_mtime_ns
+        rows = {}
+        for row in iter_staff_rows(self.file):
+            if row[4] is not None:  # Колонка E - табельный номер
+                rows.setdefault(tab_key(row[4]), row)  # Как и при поиске, берется первая строка
+        self._rows, self._mtime = rows, mtime
+        logger.info(f"Индекс сотрудников построен: {len(rows)} табельных номеров")
+
+    def _rebuild(self):
+        try:
+            self._build()
+        except Exception as e:
+            logger.exception(f"Ошибка построения индекса сотрудников: {e}")
+
+    def refresh_in_background(self):
+        """Запуск перестроения индекса в фоновом потоке (если оно еще не идет)"""
+        with self._lock:
+            if self._rebuild_thread is not None and self._rebuild_thread.is_alive():
+                return self._rebuild_thread
+            self._rebuild_thread = threading.Thread(target=self._rebuild, name="employee-index", daemon=True)
+            self._rebuild_thread.start()
+            return self._rebuild_thread
+
+    def get(self, tab_number):
+        """
+        Поиск строки сотрудника по табельному номеру
+
+        Args:
+            tab_number: табельный номер
+
+        Returns:
+            list or None: строка Excel или None, если сотрудник не найден
+        """
+        if self._rows is None:
+            self.refresh_in_background().join()  # Первый запрос ждет построения индекса
+        elif os.stat(self.file).st_mtime_ns != self._mtime:
+            logger.info("Файл списочного состава изменился, индекс перестраивается")
+            self.refresh_in_background()
+
+        row = self._rows.get(tab_key(tab_number)) if self._rows is not None else None
+        rebuild = self._rebuild_thread
+        if row is None and rebuild is not None and rebuild.is_alive():
+            rebuild.join()  # Сотрудник мог появиться в новой версии файла
+            row = self._rows.get(tab_key(tab_number)) if self._rows is not None else None
+        return row
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from openpyxl import load_workbook
+
+
+def iter_rows(file, min_row=None, max_row=None, min_col=None, max_col=None, data_only=False):
+    """
+    Потоковое чтение строк активного листа Excel (режим read_only, только значения).
+    Строки читаются лениво, граф ячеек книги в памяти не строится.
+
+    Args:
+        file: путь к файлу Excel
+        min_row: первая строка (по умолчанию первая строка листа)
+        max_row: последняя строка (по умолчанию последняя строка листа)
+        min_col: первая колонка (по умолчанию A)
+        max_col: последняя колонка (по умолчанию последняя колонка листа)
+        data_only: читать вычисленные значения формул вместо самих формул
+
+    Yields:
+        tuple: значения ячеек строки
+    """
+    workbook = load_workbook(filename=file, read_only=True, data_only=data_only)
+    try:
+        sheet = workbook.active
+        if max_row is None:
+            # Размер листа из файла часто включает пустые отформатированные строки в конце.
+            # Без него чтение заканчивается на последней фактически записанной строке
+            max_col = max_col or sheet.max_column
+            sheet.reset_dimensions()
+        yield from sheet.iter_rows(
+            min_row=min_row, max_row=max_row, min_col=min_col, max_col=max_col, values_only=True
+        )
+    finally:
+        workbook.close()  # В режиме read_only книга держит файл открытым до закрытия
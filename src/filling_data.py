@@ -2,274 +2,240 @@
 from datetime import datetime
 
 # import openpyxl as op
-from docxtpl import DocxTemplate
 from loguru import logger
 
+from src.address_parsing import datas
+from src.batch_rendering import (
+    render_batch, render_batch_to_archive, render_batch_merged, log_manifest, manifest_entry
+)
 from src.database import read_from_db
-
-
-async def generate_documents(row, formatted_date, ending, file_dog, output_path):
-    doc = DocxTemplate(file_dog)  # Загрузка шаблона
-    # Получение и проверка даты трудового договора
-    date = row.a30  # дата трудового договора
-
-    # Проверяем, что дата не None и содержит три элемента после разделения
-    if date is None or len(date.split(".")) != 3:
-        day, month, year = "--", "--", "----"
-    else:
-        day, month, year = date.split(".")
-
-    # day, month, year = date.split(".")  # Разделение даты на компоненты
-    context = {
-        "name_surname": f" {row.a5} ",  # Ф.И.О. (Иванов Иван Иванович)
-        "name_surname_completely": f" {row.a6} ",  # Ф.И.О. (Иванов И. И.)
-        "date_admission": f" {formatted_date} ",  # Дата поступления
-        "ending": f"{ending}",  # Окончание ый или ая
-        "post": f" {row.a3} ",  # Должность
-        "district": f" {row.a1} ",  # Участок
-        "salary": f" {row.a9} ",  # Часовая тарифная ставка или оклад
-        "series_number": f"{row.a14}",  # Номер паспорта
-        "phone": f"{row.a12}",  # Телефон
-        "address": f"{row.a13}",  # Адрес
-        "issue_date": f"{row.a15}",  # Дата выдачи
-        "issued_by": f"{row.a16}",  # Кем выдан
-        "code": f"{row.a17}",  # Код подразделения
-        "official_salary": "должностной оклад",
-        "official_salary_termination": "должностного оклада",
-        "month_or_hour": "в месяц",
-        "district_pro": f" {row.a19} ",  # Участок
-        "employment_contract_number": f" {row.a25_номер_договора}",  # Номер трудового договора
-        "day": f"{day}",  # День
-        "month": f"{month}",  # Месяц
-        "year": f"{year}",  # Год
-        "graduation_from_profession": f" {row.a28} ",  # Профессия в родительном падеже
+from src.date_format import format_russian_date
+from src.progress import current_progress
+from src.render_context import build_context
+from src.render_manifest import split_up_to_date, record_rendered
+from src.template_preflight import preflight_templates, split_quarantined
+from src.template_routing import contract_router
+
+
+def prepare_document(row, formatted_date, ending, file_dog, output_path):
+    """Формирование задания на рендеринг документа для одной строки"""
+    # Контекст содержит только переменные выбранного шаблона (см. src.render_context)
+    context = build_context(file_dog, lambda field: getattr(row, field), formatted_date, ending)
+
+    return {
+        "tab_number": row.a4_табельный_номер,
+        "name": row.a5,
+        "file_dog": file_dog,
+        "context": context,
+        "output_path": output_path,
+        # Формирование имени файла
+        "filename": f"{row.a0}_{row.a4_табельный_номер}_{row.a5}.docx",
     }
 
-    doc.render(context)  # Рендеринг документа
-    # Формирование имени файла
-    filename = f"{row.a0}_{row.a4_табельный_номер}_{row.a5}.docx"
-    full_path = f"{output_path}/{filename}"
 
-    doc.save(full_path)  # Сохранение документа
+async def run_document_batch(data, select_document, workers=None, archive=None, force=False, merged=False):
+    """
+    Формирование пакета документов: задания собираются по строкам, рендеринг идет в пуле процессов
 
+    Args:
+        data: строки сотрудников из базы данных
+        select_document: функция (row, formatted_date, ending) -> задание или None, если документ не нужен
+        workers: количество процессов рендеринга
+        archive: путь или файловый объект ZIP архива; если задан, документы пишутся в один архив, а не в папки
+        force: формировать все документы, не пропуская актуальные (по манифесту сформированных документов)
+        merged: формировать общий документ для печати (строки одного шаблона в одном файле через разрыв страницы)
 
-# Заполнение уведомлений
-async def filling_notifications():
-    """Заполнение уведомлений"""
+    Returns:
+        list: манифест пакета (успех/ошибка по каждой строке)
+    """
     start = datetime.now()
     logger.info(f"Время старта: {start}")
-    data = await read_from_db()
+    # Поврежденные шаблоны выявляются до рендеринга, их строки сразу попадают в манифест с ошибкой
+    preflight_templates()
+    jobs = []
+    failed = []
     for row in data:
-        logger.info(row)
-        ending = "ый" if row.a11 == "Мужчина" else "ая"
-        # await creation_contracts(row, await format_date(row.a7), ending)
+        try:
+            ending = "ый" if row.a11 == "Мужчина" else "ая"
+            job = select_document(row, format_russian_date(row.hire_date), ending)
+        except Exception as e:
+            failed.append(manifest_entry({"tab_number": row.a4_табельный_номер, "name": row.a5}, error=e))
+            continue
+        if job is not None:
+            jobs.append(job)
+
+    jobs, quarantined = split_quarantined(jobs)
+    failed += quarantined
+
+    # Документы, сформированные из тех же данных по тому же шаблону, повторно не формируются
+    # (архив и общий документ всегда собираются целиком)
+    up_to_date = []
+    if archive is None and not merged and not force:
+        jobs, up_to_date = split_up_to_date(jobs)
+
+    progress = current_progress()
+    if progress is not None:
+        progress.start(len(jobs) + len(failed) + len(up_to_date))
+        for entry in failed + up_to_date:
+            progress.advance(entry)
+
+    if archive is not None:
+        manifest = failed + render_batch_to_archive(jobs, archive, workers, progress)
+    elif merged:
+        manifest = failed + render_batch_merged(jobs, workers, progress)
+    else:
+        rendered = render_batch(jobs, workers, progress)
+        record_rendered(jobs, rendered)
+        manifest = failed + up_to_date + rendered
+    log_manifest(manifest)
+    finish = datetime.now()
+    logger.info(f"Время окончания: {finish}\n\nВремя работы: {finish - start}")
+    logger.info(f"Скорость: {len(manifest) / max((finish - start).total_seconds(), 1e-6):.1f} строк/с")
+    return manifest
+
 
-        await generate_documents(
+# Заполнение уведомлений
+async def filling_notifications(archive=None, merged=False):
+    """Заполнение уведомлений"""
+    return await run_document_batch(
+        await read_from_db(),
+        lambda row, formatted_date, ending: prepare_document(
             row=row,
-            formatted_date=await format_date(row.a7),
+            formatted_date=formatted_date,
             ending=ending,
             file_dog="data/docs_templates/уведомления/уведомление.docx",
             output_path="output/Готовые_уведомления"
-        )
+        ),
+        archive=archive, merged=merged,
+    )
 
-    finish = datetime.now()
-    logger.info(f"Время окончания: {finish}\n\nВремя работы: {finish - start}")
 
-
-# на простой
+# на простой (табельные номера по умолчанию для списка "простой")
 not_a_full_work_weeks = [7123, 856, 1268, 1188, 5429, 23511, 4211, 3307, 10851, 10800, 3639, 11073, 8065, 13103,
                          13533, 7006, 7687, 15293, 17503, 17553, 12608, 600036, 12537, ]
 
 
-async def creation_contracts_downtime(row, formatted_date, ending):
-    try:
-        # Проверяем, входит ли табельный номер в список
-        if int(row.a4_табельный_номер) in not_a_full_work_weeks:
-            await generate_documents(
-                row=row,
-                formatted_date=formatted_date,
-                ending=ending,
-                file_dog="data/docs_templates/Шаблоны_доп_соглашений/доп_соглашение_к_труд_дог_простой.docx",
-                output_path="data/outgoing/Готовые_дополнительные_договора"
-            )
-        else:
-            logger.info(f"Табельный номер {row.a4_табельный_номер} не входит в список. Договор не будет сформирован.")
-    except Exception as e:
-        logger.exception(f"Ошибка при формировании договора для табельного номера {row.a4_табельный_номер}: {e}")
-
-
-# не полная рабочая неделя
+def creation_contracts_downtime(row, formatted_date, ending):
+    return prepare_document(
+        row=row,
+        formatted_date=formatted_date,
+        ending=ending,
+        file_dog="data/docs_templates/Шаблоны_доп_соглашений/доп_соглашение_к_труд_дог_простой.docx",
+        output_path="data/outgoing/Готовые_дополнительные_договора"
+    )
+
+
+# не полная рабочая неделя (список "неполная_рабочая_неделя")
 not_a_full_work_week = [7123, 12212, 856, 1268, 1188, 5429, 23173, 23511, 4211, 3307, 10851, 10800, 3639, 11073, 8065,
                         13103, 13533, 7006, 7687, 15293, 17503, 17553, 12608, 600036, 12537, 23492, ]
 
 
-async def creation_contracts_downtime_week(row, formatted_date, ending):
-    try:
-        # Проверяем, входит ли табельный номер в список
-        if int(row.a4_табельный_номер) in not_a_full_work_week:
-            await generate_documents(
-                row=row,
-                formatted_date=formatted_date,
-                ending=ending,
-                file_dog="data/docs_templates/Шаблоны_доп_соглашений/доп_соглашение_к_труд_дог_неп_раб_время.docx",
-                output_path="data/outgoing/Готовые_дополнительные_соглашения_не_полная_рабочая_неделя"
-            )
-        else:
-            logger.info(f"Табельный номер {row.a4_табельный_номер} не входит в список. Договор не будет сформирован.")
-    except Exception as e:
-        logger.exception(f"Ошибка при формировании договора для табельного номера {row.a4_табельный_номер}: {e}")
-
-
-# Табельные номера, для перевода на другую работу
+def creation_contracts_downtime_week(row, formatted_date, ending):
+    return prepare_document(
+        row=row,
+        formatted_date=formatted_date,
+        ending=ending,
+        file_dog="data/docs_templates/Шаблоны_доп_соглашений/доп_соглашение_к_труд_дог_неп_раб_время.docx",
+        output_path="data/outgoing/Готовые_дополнительные_соглашения_не_полная_рабочая_неделя"
+    )
+
+
+# Табельные номера, для перевода на другую работу (список "перевод_на_другую_работу")
 transfer_to_another_job = [10711, 23495, 15675]
 
 
-async def creation_contracts_another_job(row, formatted_date, ending):
-    try:
-        # Проверяем, входит ли табельный номер в список
-        if int(row.a4_табельный_номер) in transfer_to_another_job:
-            await generate_documents(
-                row=row,
-                formatted_date=formatted_date,
-                ending=ending,
-                file_dog="data/docs_templates/Шаблоны_доп_соглашений/доп_соглашение_к_труд_дог_перевод.docx",
-                output_path="data/outgoing/Готовые_дополнительные_соглашения_перевод_на_другую_работу"
-            )
-        else:
-            logger.info(f"Табельный номер {row.a4_табельный_номер} не входит в список. Договор не будет сформирован.")
-    except Exception as e:
-        logger.exception(f"Ошибка при формировании договора для табельного номера {row.a4_табельный_номер}: {e}")
-
-
-# Дополнительное соглашение для увольнения
-additional_agreement_list = [23173]
+def creation_contracts_another_job(row, formatted_date, ending):
+    return prepare_document(
+        row=row,
+        formatted_date=formatted_date,
+        ending=ending,
+        file_dog="data/docs_templates/Шаблоны_доп_соглашений/доп_соглашение_к_труд_дог_перевод.docx",
+        output_path="data/outgoing/Готовые_дополнительные_соглашения_перевод_на_другую_работу"
+    )
 
 
-async def creation_contracts_additional_agreement(row, formatted_date, ending):
-    try:
-        # Проверяем, входит ли табельный номер в список
-        if int(row.a4_табельный_номер) in additional_agreement_list:
-            await generate_documents(
-                row=row,
-                formatted_date=formatted_date,
-                ending=ending,
-                file_dog="data/docs_templates/договоры_компенсации/расторжение_ЗД.docx",
-                output_path="data/outgoing/доп_согл_нпн"
-            )
-        else:
-            logger.info(f"Табельный номер {row.a4_табельный_номер} не входит в список. Договор не будет сформирован.")
-    except Exception as e:
-        logger.exception(f"Ошибка при формировании договора для табельного номера {row.a4_табельный_номер}: {e}")
+# Дополнительное соглашение для увольнения (список "расторжение")
+additional_agreement_list = [23173]
+
 
+def creation_contracts_additional_agreement(row, formatted_date, ending):
+    return prepare_document(
+        row=row,
+        formatted_date=formatted_date,
+        ending=ending,
+        file_dog="data/docs_templates/договоры_компенсации/расторжение_ЗД.docx",
+        output_path="data/outgoing/доп_согл_нпн"
+    )
 
-# Дополнительное соглашение на расширение зоны обслуживания
 
+# Дополнительное соглашение на расширение зоны обслуживания (список "расширение_зоны_обслуживания")
 data_list = [23495]
 
-async def creation_contracts_additional_agreement_health(row, formatted_date, ending):
+
+def creation_contracts_additional_agreement_health(row, formatted_date, ending):
     """Формирование дополнительного соглашения на расширение зоны обслуживания"""
-    try:
-        # Проверяем, входит ли табельный номер
-        if int(row.a4_табельный_номер) in data_list:
-            await generate_documents(
-                row=row,
-                formatted_date=formatted_date,
-                ending=ending,
-                file_dog="data/docs_templates/Шаблоны_доп_соглашений/доп_соглашение_к_труд_дог_расширение_зоны_обслуживания.docx",
-                output_path="output/доп_согл_нпн"
-            )
-        else:
-            logger.info(f"Табельный номер {row.a4_табельный_номер} не входит в список. Договор не будет сформирован.")
-    except Exception as e:
-        logger.exception(f"Ошибка при формировании договора для табельного номера {row.a4_табельный_номер}: {e}")
-
-
-
-async def filling_ditional_agreement_health_reasons():
+    return prepare_document(
+        row=row,
+        formatted_date=formatted_date,
+        ending=ending,
+        file_dog="data/docs_templates/Шаблоны_доп_соглашений/доп_соглашение_к_труд_дог_расширение_зоны_обслуживания.docx",
+        output_path="output/доп_согл_нпн"
+    )
+
+
+# Списки табельных номеров по умолчанию. При первом запуске приложения они заносятся в базу данных
+# (seed_target_lists), дальше список хранится в базе данных и заменяется загрузкой файла (POST /target_lists/{название})
+TARGET_LISTS = {
+    "простой": not_a_full_work_weeks,
+    "неполная_рабочая_неделя": not_a_full_work_week,
+    "перевод_на_другую_работу": transfer_to_another_job,
+    "расторжение": additional_agreement_list,
+    "расширение_зоны_обслуживания": data_list,
+    "адреса": datas,  # Парсинг адресов для конверта
+}
+
+
+async def read_target_rows(list_name):
+    """Сотрудники из списка list_name, выбранные одним запросом к базе данных"""
+    return await read_from_db(target_list=list_name)
+
+
+async def filling_ditional_agreement_health_reasons(archive=None, merged=False):
     """Заполнение дополнительного соглашения по состоянию здоровья"""
-    start = datetime.now()
-    logger.info(f"Время старта: {start}")
-    data = await read_from_db()
-    for row in data:
-        logger.info(row)
-        ending = "ый" if row.a11 == "Мужчина" else "ая"
-        await creation_contracts_additional_agreement(row, await format_date(row.a7), ending)
-    finish = datetime.now()
-    logger.info(f"Время окончания: {finish}")
-    logger.info(f"Время работы: {finish - start}")
+    return await run_document_batch(
+        await read_target_rows("расторжение"), creation_contracts_additional_agreement, archive=archive, merged=merged
+    )
 
 
-async def filling_ditional_agreement_health_reasons_agreement_health():
+async def filling_ditional_agreement_health_reasons_agreement_health(archive=None, merged=False):
     """Заполнение дополнительного соглашения за расширение зоны обслуживания"""
-    start = datetime.now()
-    logger.info(f"Время старта: {start}")
-    data = await read_from_db()
-    for row in data:
-        logger.info(row)
-        ending = "ый" if row.a11 == "Мужчина" else "ая"
-        await creation_contracts_additional_agreement_health(row, await format_date(row.a7), ending)
-    finish = datetime.now()
-    logger.info(f"Время окончания: {finish}")
-    logger.info(f"Время работы: {finish - start}")
-
+    return await run_document_batch(
+        await read_target_rows("расширение_зоны_обслуживания"), creation_contracts_additional_agreement_health,
+        archive=archive, merged=merged,
+    )
 
 
-async def formation_and_filling_of_employment_contracts_for_transfer_to_another_job():
+async def formation_and_filling_of_employment_contracts_for_transfer_to_another_job(archive=None, merged=False):
     """Формирование трудовых договоров на переход на другую работу"""
-    start = datetime.now()
-    logger.info(f"Время старта: {start}")
-    data = await read_from_db()
-    for row in data:
-        logger.info(row)
-        ending = "ый" if row.a11 == "Мужчина" else "ая"
-        await creation_contracts_another_job(row, await format_date(row.a7), ending)
-    finish = datetime.now()
-    logger.info(f"Время окончания: {finish}\n\nВремя работы: {finish - start}")
+    return await run_document_batch(
+        await read_target_rows("перевод_на_другую_работу"), creation_contracts_another_job,
+        archive=archive, merged=merged,
+    )
 
 
-async def formation_and_filling_of_part_time_employment_contracts():
+async def formation_and_filling_of_part_time_employment_contracts(archive=None, merged=False):
     """Формирование трудовых договоров на не полную рабочую неделю"""
-    start = datetime.now()
-    logger.info(f"Время старта: {start}")
-    data = await read_from_db()
-    for row in data:
-        logger.info(row)
-        ending = "ый" if row.a11 == "Мужчина" else "ая"
-        await creation_contracts_downtime_week(row, await format_date(row.a7), ending)
-    finish = datetime.now()
-    logger.info(f"Время окончания: {finish}\n\nВремя работы: {finish - start}")
+    return await run_document_batch(
+        await read_target_rows("неполная_рабочая_неделя"), creation_contracts_downtime_week,
+        archive=archive, merged=merged,
+    )
 
 
-async def formation_and_filling_of_employment_contracts_for_idle_time_enterprise():
+async def formation_and_filling_of_employment_contracts_for_idle_time_enterprise(archive=None, merged=False):
     """Формирование трудовых договоров на простой предприятия"""
-    start = datetime.now()
-    logger.info(f"Время старта: {start}")
-    data = await read_from_db()
-    for row in data:
-        logger.info(row)
-        ending = "ый" if row.a11 == "Мужчина" else "ая"
-        await creation_contracts_downtime(row, await format_date(row.a7), ending)
-    finish = datetime.now()
-    logger.info(f"Время окончания: {finish}\n\nВремя работы: {finish - start}")
-
-
-async def format_date(date):
-    months = {
-        1: "января",
-        2: "февраля",
-        3: "марта",
-        4: "апреля",
-        5: "мая",
-        6: "июня",
-        7: "июля",
-        8: "августа",
-        9: "сентября",
-        10: "октября",
-        11: "ноября",
-        12: "декабря",
-    }
-    date = datetime.strptime(date, "%d.%m.%Y")
-    return '" {:02d} " {} {} г.'.format(date.day, months[date.month], date.year)
+    return await run_document_batch(
+        await read_target_rows("простой"), creation_contracts_downtime, archive=archive, merged=merged
+    )
 
 
 # async def open_list_gup():
@@ -285,179 +251,27 @@ async def format_date(date):
 #     return list_gup  # возвращаем список
 
 
-async def formation_employment_contracts_filling_data():
+async def formation_employment_contracts_filling_data(archive=None, merged=False):
     """Формирование трудовых договоров"""
-
-    start = datetime.now()
-    logger.info(f"Время старта: {start}")
-    data = await read_from_db()
-    for row in data:
-        logger.info(row)
-        ending = "ый" if row.a11 == "Мужчина" else "ая"
-        await creation_contracts(row, await format_date(row.a7), ending)
-    finish = datetime.now()
-    logger.info(f"Время окончания: {finish}\n\nВремя работы: {finish - start}")
-
-
-async def creation_contracts(row, formatted_date, ending):
-    try:
-        if row.a31 == "напечатанный":
-            pass
-
-        else:
-
-            if float(row.a9) > 1000:  # Оклад
-                if row.a34 == "None":
-                    await generate_documents(
-                        row=row,
-                        formatted_date=formatted_date,
-                        ending=ending,
-                        file_dog="data/docs_templates/Шаблоны_трудовых_договоров/ИТР/Шаблон_трудовой_договор.docx",
-                        output_path="data/outgoing/Готовые_договора"
-                    )
-                elif row.a34 == "Шаблон_трудовой_договор_уборщ_8_часов":  # 12 часов
-                    await generate_documents(
-                        row=row,
-                        formatted_date=formatted_date,
-                        ending=ending,
-                        file_dog="data/docs_templates/Шаблоны_трудовых_договоров/ИТР/Шаблон_трудовой_договор_уборщ_8_часов.docx",
-                        output_path="data/outgoing/Готовые_договора"
-                    )
-                elif (
-                        row.a34 == "Шаблон_трудовой_договор_8_часов_ИТР_подземные"
-                ):  # 12 часов
-                    await generate_documents(
-                        row=row,
-                        formatted_date=formatted_date,
-                        ending=ending,
-                        file_dog="data/docs_templates/Шаблоны_трудовых_договоров/ИТР/Шаблон_трудовой_договор_8_часов_ИТР_подземные.docx",
-                        output_path="data/outgoing/Готовые_договора"
-                    )
-                elif row.a34 == "Шаблон_трудовой_договор_12_часов":  # 12 часов
-                    await generate_documents(
-                        row=row,
-                        formatted_date=formatted_date,
-                        ending=ending,
-                        file_dog="data/docs_templates/Шаблоны_трудовых_договоров/ИТР/Шаблон_трудовой_договор_12_часов.docx",
-                        output_path="data/outgoing/Готовые_договора"
-                    )
-                elif row.a34 == "Шаблон_трудовой_договор_6_часов":  # 6 часов
-                    await generate_documents(
-                        row=row,
-                        formatted_date=formatted_date,
-                        ending=ending,
-                        file_dog="data/docs_templates/Шаблоны_трудовых_договоров/ИТР/Шаблон_трудовой_договор_6_часов.docx",
-                        output_path="data/outgoing/Готовые_договора"
-                    )
-                elif row.a34 == "Шаблон_трудовой_договор_7_часов":
-                    await generate_documents(
-                        row=row,
-                        formatted_date=formatted_date,
-                        ending=ending,
-                        file_dog="data/docs_templates/Шаблоны_трудовых_договоров/ИТР/Шаблон_трудовой_договор_7_часов.docx",
-                        output_path="data/outgoing/Готовые_договора"
-                    )
-                elif row.a34 == "Шаблон_трудовой_договор_8_часов_ИТР_контора_вредность_не_норм_7":
-                    await generate_documents(
-                        row=row,
-                        formatted_date=formatted_date,
-                        ending=ending,
-                        file_dog="data/docs_templates/Шаблоны_трудовых_договоров/ИТР/Шаблон_трудовой_договор_8_часов_ИТР_контора_вредность_не_норм_7.docx",
-                        output_path="data/outgoing/Готовые_договора"
-                    )
-                elif row.a34 == "Шаблон_трудовой_договор_водителя_8_часов":
-                    await generate_documents(
-                        row=row,
-                        formatted_date=formatted_date,
-                        ending=ending,
-                        file_dog="data/docs_templates/Шаблоны_трудовых_договоров/ИТР/Шаблон_трудовой_договор_водителя_8_часов.docx",
-                        output_path="data/outgoing/Готовые_договора"
-                    )
-                elif row.a34 == "Шаблон_трудовой_договор_8_часов_ИТР_без_вредности":
-                    await generate_documents(
-                        row=row,
-                        formatted_date=formatted_date,
-                        ending=ending,
-                        file_dog="data/docs_templates/Шаблоны_трудовых_договоров/ИТР/Шаблон_трудовой_договор_8_часов_ИТР_без_вредности.docx",
-                        output_path="data/outgoing/Готовые_договора"
-                    )
-
-                elif row.a34 == "Шаблон_трудовой_договор_24_часа_без_вредн":
-                    await generate_documents(
-                        row=row,
-                        formatted_date=formatted_date,
-                        ending=ending,
-                        file_dog="data/docs_templates/Шаблоны_трудовых_договоров/Рабочий/Шаблон_трудовой_договор_24_часа_без_вредн.docx",
-                        output_path="data/outgoing/Готовые_договора"
-                    )
-
-            elif float(row.a9) < 1000:  # Часовая тарифная ставка
-                if row.a34 == "None":
-                    await generate_documents(
-                        row=row,
-                        formatted_date=formatted_date,
-                        ending=ending,
-                        file_dog="data/docs_templates/Шаблоны_трудовых_договоров/Рабочий/Шаблон_трудовой_договор.docx",
-                        output_path="data/outgoing/Готовые_договора"
-                    )
-                elif row.a34 == "Шаблон_трудовой_договор_уборщ_8_часов":  # 12 часов
-                    await generate_documents(
-                        row=row,
-                        formatted_date=formatted_date,
-                        ending=ending,
-                        file_dog="data/docs_templatesШаблоны_трудовых_договоров/Рабочий/Шаблон_трудовой_договор_уборщ_8_часов.docx",
-                        output_path="data/outgoing/Готовые_договора"
-                    )
-                elif row.a34 == "Шаблон_трудовой_договор_8_часов_ИТР_подземные":  # 12 часов
-                    await generate_documents(
-                        row=row,
-                        formatted_date=formatted_date,
-                        ending=ending,
-                        file_dog="data/docs_templates/Шаблоны_трудовых_договоров/Рабочий/Шаблон_трудовой_договор_8_часов_ИТР_подземные.docx",
-                        output_path="data/outgoing/Готовые_договора"
-                    )
-                elif row.a34 == "Шаблон_трудовой_договор_12_часов":  # 12 часов
-                    await generate_documents(
-                        row=row,
-                        formatted_date=formatted_date,
-                        ending=ending,
-                        file_dog="data/docs_templates/Шаблоны_трудовых_договоров/Рабочий/Шаблон_трудовой_договор_12_часов.docx",
-                        output_path="data/outgoing/Готовые_договора"
-                    )
-
-                elif row.a34 == "ТД_6_час.раб.":  # 6 часов
-                    await generate_documents(
-                        row=row,
-                        formatted_date=formatted_date,
-                        ending=ending,
-                        file_dog="data/docs_templates/Шаблоны_трудовых_договоров/Рабочий/ТД_6_час.раб..docx",
-                        output_path="data/outgoing/Готовые_договора"
-                    )
-
-                elif row.a34 == "Шаблон_трудовой_договор_7_часов":
-                    await generate_documents(
-                        row=row,
-                        formatted_date=formatted_date,
-                        ending=ending,
-                        file_dog="data/docs_templates/Шаблоны_трудовых_договоров/Рабочий/Шаблон_трудовой_договор_7_часов.docx",
-                        output_path="data/outgoing/Готовые_договора"
-                    )
-                elif row.a34 == "Шаблон_трудовой_договор_8_часов_ИТР_контора_вредность_не_норм_7":
-                    await generate_documents(
-                        row=row,
-                        formatted_date=formatted_date,
-                        ending=ending,
-                        file_dog="data/docs_templatesШаблоны_трудовых_договоров/Рабочий/Шаблон_трудовой_договор_8_часов_ИТР_контора_вредность_не_норм_7.docx",
-                        output_path="data/outgoing/Готовые_договора"
-                    )
-                elif row.a34 == "Шаблон_трудовой_договор_водителя_8_часов":
-                    await generate_documents(
-                        row=row,
-                        formatted_date=formatted_date,
-                        ending=ending,
-                        file_dog="data/docs_templates/Шаблоны_трудовых_договоров/Рабочий/Шаблон_трудовой_договор_водителя_8_часов.docx",
-                        output_path="data/outgoing/Готовые_договора"
-                    )
-
-    except Exception as e:
-        logger.exception(e)
+    rows = list(await read_from_db())
+    # Неизвестные шаблоны сообщаются до рендеринга для строк, по которым договор будет формироваться
+    contract_router.report_unknown([row for row in rows if not is_printed(row)])
+    return await run_document_batch(rows, creation_contracts, archive=archive, merged=merged)
+
+
+def is_printed(row):
+    """Договор сотрудника уже напечатан (колонка AF) - повторно не формируется"""
+    return row.a31 == "напечатанный"
+
+
+def creation_contracts(row, formatted_date, ending):
+    """Трудовой договор: шаблон определяется по окладу (salary, колонка J) и колонке AI (a34) через таблицу маршрутов"""
+    if is_printed(row):
+        return None
+    return prepare_document(
+        row=row,
+        formatted_date=formatted_date,
+        ending=ending,
+        file_dog=contract_router.resolve(row.salary, row.a34),
+        output_path="data/outgoing/Готовые_договора"
+    )
@@ -1,30 +1,23 @@
-from datetime import datetime
-
 from loguru import logger
 
 from src.database import read_from_db
-from src.filling_data import generate_documents, format_date
+from src.filling_data import prepare_document, run_document_batch
 
 
-async def formation_reduction_notification():
+async def formation_reduction_notification(archive=None, merged=False):
     """Заполнение уведомлений о сокращении штата"""
 
     logger.info("Пользователь выбрал формирование уведомление о сокращении")
 
-    start = datetime.now()
-    logger.info(f"Время старта: {start}")
-    data = await read_from_db()
-    for row in data:
-        logger.info(row)
-        ending = "ый" if row.a11 == "Мужчина" else "ая"
-        logger.info(row.a7)
-        await generate_documents(
+    return await run_document_batch(
+        await read_from_db(),
+        lambda row, formatted_date, ending: prepare_document(
             row=row,
-            formatted_date=await format_date(row.a7),
+            formatted_date=formatted_date,
             ending=ending,
             file_dog="data/docs_templates/Сокращение/уведомления.docx",  # шаблон уведомления
             output_path="output/Готовые_уведомления_сокращение"  # папка для сохранения уведомления
-        )
-
-    finish = datetime.now()
-    logger.info(f"Время окончания: {finish}\n\nВремя работы: {finish - start}")
+        ),
+        archive=archive,
+        merged=merged,
+    )
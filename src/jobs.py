@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import inspect
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from loguru import logger
+
+from src.database import db
+from src.progress import Progress, bind_progress
+
+JOB_WORKERS = 2  # Количество одновременно выполняемых задач
+JOB_HISTORY = 100  # Количество завершенных задач, хранимых для просмотра статуса
+
+
+class Job:
+    """Фоновая задача: тип, состояние и результат"""
+
+    def __init__(self, job_type):
+        self.id = uuid.uuid4().hex
+        self.job_type = job_type
+        self.status = "queued"  # queued -> running -> done / error
+        self.created = datetime.now()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.progress = Progress()
+
+    def to_dict(self):
+        """Состояние задачи для ответа API"""
+        data = {
+            "job_id": self.id,
+            "job_type": self.job_type,
+            "status": self.status,
+            "created": self.created.isoformat(),
+            "started": self.started.isoformat() if self.started else None,
+            "finished": self.finished.isoformat() if self.finished else None,
+            "error": self.error,
+            "progress": self.progress.snapshot(),
+        }
+        if isinstance(self.result, list):  # Манифест пакета документов
+            errors = [entry for entry in self.result if isinstance(entry, dict) and not entry.get("ok", True)]
+            data["result"] = {"total": len(self.result), "ok": len(self.result) - len(errors), "errors": errors}
+        elif isinstance(self.result, dict):  # Итоги задачи; файл результата отдается по /jobs/{id}/download
+            data["result"] = {key: value for key, value in self.result.items() if key != "download"}
+            if "download" in self.result:
+                data["download_url"] = f"/jobs/{self.id}/download"
+        return data
+
+
+class JobQueue:
+    """
+    Очередь фоновых задач с ограниченным числом потоков.
+    Задачи одного типа не выполняются одновременно: повторный запуск возвращает уже активную задачу.
+    """
+
+    def __init__(self, workers=JOB_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._jobs = {}  # id -> Job
+        self._active = {}  # тип задачи -> поставленная или выполняемая задача
+        self._lock = threading.Lock()
+
+    def submit(self, job_type, func, *args):
+        """
+        Постановка задачи в очередь
+
+        Args:
+            job_type: тип задачи (для взаимного исключения)
+            func: функция или корутинная функция задачи
+            args: аргументы функции
+
+        Returns:
+            Job: новая задача или уже активная задача того же типа
+        """
+        with self._lock:
+            active = self._active.get(job_type)
+            if active is not None:
+                logger.warning(f"Задача {job_type} уже выполняется: {active.id}")
+                return active
+            job = Job(job_type)
+            self._jobs[job.id] = job
+            self._active[job_type] = job
+            self._prune()
+        self._executor.submit(self._run, job, func, args)
+        logger.info(f"Задача {job_type} поставлена в очередь: {job.id}")
+        return job
+
+    def _run(self, job, func, args):
+        job.status = "running"
+        job.started = datetime.now()
+        bind_progress(job.progress)  # Пакетные генераторы сообщают прогресс в задачу этого потока
+        try:
+            result = func(*args)
+            if inspect.isawaitable(result):
+                result = asyncio.run(result)  # Собственный цикл событий в потоке задачи
+            job.result = result
+            job.status = "done"
+        except Exception as e:
+            logger.exception(f"Ошибка задачи {job.job_type}: {e}")
+            job.error = str(e)
+            job.status = "error"
+        finally:
+            job.finished = datetime.now()
+            if not db.is_closed():
+                db.close()  # Закрываем подключение к базе данных, открытое задачей в этом потоке
+            with self._lock:
+                self._active.pop(job.job_type, None)
+            logger.info(f"Задача {job.job_type} завершена: {job.status}, время работы: {job.finished - job.started}")
+
+    def _prune(self):
+        """Удаление самых старых завершенных задач сверх JOB_HISTORY"""
+        finished = [job for job in self._jobs.values() if job.status in ("done", "error")]
+        for job in finished[:max(0, len(finished) - JOB_HISTORY)]:
+            del self._jobs[job.id]
+
+    def active(self, job_type):
+        """Поставленная или выполняемая задача этого типа или None"""
+        with self._lock:
+            return self._active.get(job_type)
+
+    def get(self, job_id):
+        """Задача по идентификатору или None"""
+        return self._jobs.get(job_id)
+
+    def list(self):
+        """Все хранимые задачи, новые первыми"""
+        return sorted(self._jobs.values(), key=lambda job: job.created, reverse=True)
+
+    def shutdown(self):
+        """Остановка очереди: новые задачи не принимаются, поставленные отменяются"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,95 +1,114 @@
 # -*- coding: utf-8 -*-
-import os
-import sqlite3
-from tkinter import Tk
-from tkinter.filedialog import askopenfilename
-
 from loguru import logger
 from openpyxl import load_workbook
 
-table_name = "parsing"  # Имя таблицы в базе данных
-file_database = "data/data.db"  # Имя файла базы данных
+from src.database import read_profession_mapping, replace_profession_mapping, run_query
+from src.excel_reader import iter_rows
+
+
+FIRST_DATA_ROW = 5  # Первая строка данных списочного состава
+TAB_NUMBER_COLUMN = 6  # Колонка F - значение, по которому ищется профессия
+PROFESSION_COLUMN = 10  # Колонка J - профессия, перезаписываемая из базы данных
 
 
-async def opening_the_database():
-    """Открытие базы данных"""
-    conn = sqlite3.connect("data/data.db")  # Создаем соединение с базой данных
-    cursor = conn.cursor()
-    return conn, cursor
+def profession_index(pairs):
+    """Словарь табельный номер -> профессия (при повторах берется первое соответствие, как раньше)"""
+    index = {}
+    for tab_number, profession in pairs:
+        index.setdefault(tab_number, profession)
+    return index
 
 
-async def opening_a_files():
-    """Открытие файла Excel выбором файла"""
-    root = Tk()
-    root.withdraw()
-    filename = askopenfilename(filetypes=[("Excel Files", "*.xlsx")])
-    return filename
+def write_professions(sheet, index, first_row=FIRST_DATA_ROW):
+    """
+    Перезапись профессий в листе по словарю: чтение только колонок F..J до реального конца листа,
+    запись только в ячейки, значение которых меняется
+
+    Args:
+        sheet: лист Excel, открытый для записи
+        index: табельный номер -> профессия
+        first_row: первая строка данных
 
+    Returns:
+        tuple: (найдено соответствий, изменено ячеек, строк без соответствия)
+    """
+    found = changed = missing = 0
+    offset = PROFESSION_COLUMN - TAB_NUMBER_COLUMN
+    for row in sheet.iter_rows(min_row=first_row, max_row=sheet.max_row,
+                               min_col=TAB_NUMBER_COLUMN, max_col=PROFESSION_COLUMN):
+        profession = index.get(str(row[0].value))
+        if profession is None:
+            missing += 1
+            continue
+        found += 1
+        if row[offset].value != profession:
+            row[offset].value = profession  # Записываем данные если найдены сходства
+            changed += 1
+    return found, changed, missing
 
-async def compare_and_rewrite_professions():
-    """Изменение от 24.01.2024 Сравнение и перезапись значений профессии в файле Excel счет начинается с 0"""
-    conn, cursor = opening_the_database()
-    # Открываем выбор файла Excel для чтения данных
-    filename = await opening_a_files()
-    # Загружаем выбранный файл Excel
+
+async def compare_and_rewrite_professions(filename):
+    """
+    Изменение от 24.01.2024 Сравнение и перезапись значений профессии в файле Excel (колонка J по колонке F)
+
+    Args:
+        filename: путь к файлу Excel (загруженный файл или файл на сервере), перезаписывается на месте
+
+    Returns:
+        dict: итоги сверки и путь к файлу для скачивания (download)
+    """
+    # Загружаем выбранный файл Excel (полный режим - файл перезаписывается)
     workbook = load_workbook(filename=filename)
     sheet = workbook.active
-    # Считываем значения из базы данных
-    cursor.execute(f"SELECT * FROM {table_name}")
-    db_data = cursor.fetchall()
-    # Сравниваем значения колонки табельного номера с базой данных и перезаписываем значение профессии в колонку C
-    for row in sheet.iter_rows(min_row=5, max_row=1077):
-        value_D = str(row[5].value)  # Значение в колонке с которой сравниваются данные
-        logger.info(value_D)
-        matching_rows = [db_row for db_row in db_data if db_row[0] == value_D]
-        if matching_rows:
-            profession = matching_rows[0][1]
-            row[9].value = profession  # Записываем данные если найдены сходства
-
-    workbook.save(filename)  # Сохраняем изменения в файле Excel
+    # Соответствия табельных номеров и профессий из базы данных - поиск по словарю для каждой строки
+    index = profession_index(await run_query(read_profession_mapping))
+    found, changed, missing = write_professions(sheet, index)
+    logger.info(f"Профессии: найдено соответствий {found}, изменено ячеек {changed}, без соответствия {missing}")
+
+    if changed:
+        workbook.save(filename)  # Сохраняем изменения в файле Excel
     workbook.close()
-    conn.close()  # Закрываем соединение с базой данных
+    return {"found": found, "changed": changed, "missing": missing, "download": filename}
+
+
+def profession_pairs(rows, columns):
+    """
+    Пары (табельный номер, профессия) из строк Excel по сопоставлению колонок
+
+    Args:
+        rows: строки Excel (кортежи значений)
+        columns: {"tab_number": индекс колонки, "profession": индекс колонки}, счет с 0
+    """
+    tab_number_column, profession_column = columns["tab_number"], columns["profession"]
+    for row in rows:
+        yield str(row[tab_number_column]), str(row[profession_column])  # Преобразуем значения в строку
 
 
-async def parsing_document_1(min_row, max_row, column, column_1) -> None:
+async def parsing_document_1(filename, min_row, max_row, column=None, column_1=None, columns=None) -> None:
     """
     Осуществляет парсинг данных из файла Excel и вставляет их в базу данных SQLite.
 
+    :param filename: Путь к файлу Excel (загруженный файл или файл на сервере).
     :param min_row: Строка, с которой начинается считывание данных.
     :param max_row: Строка, с которой заканчивается считывание данных.
-    :param column: Столбец, с которого начинается считывание данных.
-    :param column_1: Столбец, с которого начинается считывание данных.
+    :param column: Столбец табельного номера (счет с 0).
+    :param column_1: Столбец профессии (счет с 0).
+    :param columns: Сопоставление колонок {"tab_number": индекс, "profession": индекс} вместо column и column_1.
     """
-    filename = await opening_a_files()  # Открываем выбор файла Excel для чтения данных
-    workbook = load_workbook(filename=filename)  # Загружаем выбранный файл Excel
-    sheet = workbook.active
-    try:
-        os.remove(file_database)  # Удаляем файл базы данных
-    except FileNotFoundError:
-        logger.info("Файл базы данных не найден")
-
-    conn = sqlite3.connect(file_database)  # Создаем соединение с базой данных
-    cursor = conn.cursor()
-    # Создаем таблицу в базе данных, если она еще не существует
-    cursor.execute(f"CREATE TABLE IF NOT EXISTS {table_name} (table_column_1, table_column_2)")
-    # Считываем данные из колонки A и вставляем их в базу данных
-    for row in sheet.iter_rows(min_row=int(min_row), max_row=int(max_row), values_only=True):
-        table_column_1 = str(row[int(column)])  # Преобразуем значение в строку
-        table_column_2 = str(row[int(column_1)])  # Преобразуем значение в строку
-        # Проверяем, существует ли запись с таким табельным номером в базе данных
-        cursor.execute(f"SELECT * FROM {table_name} WHERE table_column_1 = ? AND table_column_2 = ?",
-                       (table_column_1, table_column_2), )
-        existing_row = cursor.fetchone()
-        # Если запись с таким табельным номером не существует, вставляем данные в базу данных
-        if existing_row is None:
-            cursor.execute(f"INSERT INTO {table_name} VALUES (?, ?)", (table_column_1, table_column_2), )
-    # Удаляем повторы по табельному номеру
-    cursor.execute(
-        f"DELETE FROM {table_name} WHERE rowid NOT IN (SELECT min(rowid) FROM {table_name} GROUP BY table_column_1, table_column_2)")
-    # Сохраняем изменения в базе данных и закрываем соединение
-    conn.commit()
-    conn.close()
+    if columns is None:
+        columns = {"tab_number": int(column), "profession": int(column_1)}
+
+    def load():
+        # Один проход по строкам: чтение только нужных колонок, повторы отбрасываются при загрузке
+        rows = iter_rows(filename, min_row=int(min_row), max_row=int(max_row), max_col=max(columns.values()) + 1)
+        return replace_profession_mapping(profession_pairs(rows, columns))
+
+    # Таблица соответствий заменяется одной транзакцией
+    await run_query(load)
 
 
 if __name__ == "__main__":
-    compare_and_rewrite_professions()  # Запускаем функцию для парсинга данных из файла Excel
+    import asyncio
+    import sys
+
+    asyncio.run(compare_and_rewrite_professions(sys.argv[1]))  # Сверка профессий в файле, указанном при запуске
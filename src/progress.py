@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from contextvars import ContextVar
+
+PROGRESS_ERRORS = 50  # Количество последних ошибок строк, передаваемых в ленте прогресса
+
+_current = ContextVar("progress", default=None)
+
+
+class Progress:
+    """Прогресс пакетной задачи: обработано строк, скорость, оставшееся время и ошибки строк"""
+
+    def __init__(self):
+        self.total = 0
+        self.done = 0
+        self.error_count = 0
+        self.errors = []  # Последние ошибки строк
+        self.started = None
+        self._lock = threading.Lock()
+
+    def start(self, total):
+        """Начало пакета из total строк"""
+        with self._lock:
+            self.total = total
+            self.done = 0
+            self.error_count = 0
+            self.errors = []
+            self.started = time.monotonic()
+
+    def advance(self, entry):
+        """Учет обработанной строки по записи манифеста"""
+        with self._lock:
+            self.done += 1
+            if not entry["ok"]:
+                self.error_count += 1
+                self.errors.append({"tab_number": entry["tab_number"], "name": entry["name"], "error": entry["error"]})
+                del self.errors[:-PROGRESS_ERRORS]
+
+    def snapshot(self):
+        """Текущее состояние для ленты прогресса"""
+        with self._lock:
+            elapsed = time.monotonic() - self.started if self.started is not None else 0
+            rate = self.done / elapsed if elapsed > 0 else 0
+            return {
+                "total": self.total,
+                "done": self.done,
+                "rate": round(rate, 2),  # строк/с
+                "eta": round((self.total - self.done) / rate, 1) if rate > 0 else None,  # секунд до окончания
+                "elapsed": round(elapsed, 1),
+                "error_count": self.error_count,
+                "errors": list(self.errors),
+            }
+
+
+def bind_progress(progress):
+    """Привязка прогресса к текущему контексту выполнения (поток задачи)"""
+    _current.set(progress)
+
+
+def current_progress():
+    """Прогресс текущей задачи или None, если код выполняется вне очереди задач"""
+    return _current.get()
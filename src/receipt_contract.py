@@ -1,35 +1,42 @@
-import openpyxl as op
-from docxtpl import DocxTemplate
 from datetime import datetime
 from loguru import logger
 
+from src.date_format import EMPTY_DATE, format_russian_date
+from src.excel_reader import iter_rows
+from src.render_context import build_context
+from src.template_cache import get_template
+from src.template_preflight import preflight_templates, quarantine_error
+from src.template_routing import contract_router
+
+
+FIRST_DATA_ROW = 5  # Первая строка с данными в списочном составе
+LAST_DATA_COLUMN = 35  # Последняя колонка с данными (AI)
+
+
+def iter_staff_rows(file):
+    """
+    Построчное чтение списочного состава (колонки A–AI): каждая строка берется целиком за один вызов.
+    Чтение заканчивается на последней фактически заполненной строке, пустые строки пропускаются.
+    Общий загрузчик для process_contracts_from_excel и process_single_contract.
+
+    Yields:
+        list: значения ячеек строки
+    """
+    for row in iter_rows(file, min_row=FIRST_DATA_ROW, max_col=LAST_DATA_COLUMN):
+        # Отдаем только непустые строки (если хотя бы одна ячейка заполнена)
+        if any(cell is not None for cell in row):
+            yield list(row)
+
 
 def get_all_data(file):
     """
-    Получение всех данных из Excel-файла (строки 5–1115, колонки A–AI).
+    Получение всех данных из Excel-файла (с 5 строки до конца данных, колонки A–AI).
 
     Returns:
         list: список списков, где каждый список — строка таблицы
     """
     try:
-        wb = op.load_workbook(file)
-        ws = wb.active
-
-        all_data = []
-
-        # Перебираем строки с 5 по 1115
-        for row_num in range(5, 1116):
-            row_data = []
-            # Собираем значения из колонок A–AI (1–35)
-            for col_num in range(1, 36):
-                row_data.append(ws.cell(row=row_num, column=col_num).value)
-
-            # Добавляем только непустые строки (если хотя бы одна ячейка заполнена)
-            if any(cell is not None for cell in row_data):
-                all_data.append(row_data)
-
-        return all_data
-
+        return list(iter_staff_rows(file))
     except FileNotFoundError:
         logger.error(f"Файл не найден: {file}")
         return None
@@ -57,28 +64,6 @@ def get_contract_by_number(search_value, all_data):
     return None
 
 
-def format_date(date_str):
-    """
-    Форматирование даты из различных форматов
-
-    Args:
-        date_str: дата в виде строки или datetime объекта
-
-    Returns:
-        str: отформатированная дата
-    """
-    try:
-        if isinstance(date_str, datetime):
-            return date_str.strftime("%d.%m.%Y")
-        elif isinstance(date_str, str):
-            return date_str
-        else:
-            return "__.__.____"
-    except Exception as e:
-        logger.error(f"Ошибка форматирования даты: {e}")
-        return "__.__.____"
-
-
 def map_excel_row_to_dict(row_data):
     """
     Преобразование строки Excel в словарь с нужными полями
@@ -135,52 +120,16 @@ def generate_document(row_dict, file_dog, output_path):
             logger.error(f"Файл шаблона не найден: {file_dog}")
             return
 
-        doc = DocxTemplate(file_dog)
+        doc = get_template(file_dog)
 
         # Определяем окончание по полу
         ending = "ый" if row_dict.get('a11') == "Мужчина" else "ая"
 
-        # Форматируем дату поступления
-        formatted_date = format_date(row_dict.get('a7'))
+        # Форматируем дату поступления (так же, как в пакетном формировании договоров)
+        formatted_date = format_russian_date(row_dict.get('a7'), default=EMPTY_DATE)
 
-        # Получение и проверка даты трудового договора
-        date = row_dict.get('a30')
-
-        if date is None or (isinstance(date, str) and len(date.split(".")) != 3):
-            day, month, year = "--", "--", "----"
-        else:
-            date_str = str(date)
-            parts = date_str.split(".")
-            if len(parts) == 3:
-                day, month, year = parts
-            else:
-                day, month, year = "--", "--", "----"
-
-        # Подготовка контекста для заполнения
-        context = {
-            "name_surname": f" {row_dict.get('a5', '')} ",
-            "name_surname_completely": f" {row_dict.get('a6', '')} ",
-            "date_admission": f" {formatted_date} ",
-            "ending": f"{ending}",
-            "post": f" {row_dict.get('a3', '')} ",
-            "district": f" {row_dict.get('a1', '')} ",
-            "salary": f" {row_dict.get('a9', '')} ",
-            "series_number": f"{row_dict.get('a14', '')}",
-            "phone": f"{row_dict.get('a12', '')}",
-            "address": f"{row_dict.get('a13', '')}",
-            "issue_date": f"{row_dict.get('a15', '')}",
-            "issued_by": f"{row_dict.get('a16', '')}",
-            "code": f"{row_dict.get('a17', '')}",
-            "official_salary": "должностной оклад",
-            "official_salary_termination": "должностного оклада",
-            "month_or_hour": "в месяц",
-            "district_pro": f" {row_dict.get('a19', '')} ",
-            "employment_contract_number": f" {row_dict.get('a25_номер_договора', '')}",
-            "day": f"{day}",
-            "month": f"{month}",
-            "year": f"{year}",
-            "graduation_from_profession": f" {row_dict.get('a28', '')} ",
-        }
+        # Контекст содержит только переменные шаблона (см. src.render_context)
+        context = build_context(file_dog, row_dict.get, formatted_date, ending)
 
         doc.render(context)
 
@@ -199,7 +148,7 @@ def generate_document(row_dict, file_dog, output_path):
 
 def get_template_path(template_name, salary):
     """
-    Определение пути к шаблону на основе названия и оклада
+    Определение пути к шаблону на основе названия и оклада (по таблице маршрутов)
 
     Args:
         template_name: название шаблона из колонки AI
@@ -208,19 +157,7 @@ def get_template_path(template_name, salary):
     Returns:
         str: путь к шаблону
     """
-    base_path_itr = "data/docs_templates/Шаблоны_трудовых_договоров/ИТР"
-    base_path_worker = "data/docs_templates/Шаблоны_трудовых_договоров/Рабочий"
-
-    # Определяем базовый путь по окладу
-    is_itr = float(salary) > 1000 if salary else False
-    base_path = base_path_itr if is_itr else base_path_worker
-
-    # Если шаблон не указан или None
-    if template_name is None or template_name == "None":
-        return f"{base_path}/Шаблон_трудовой_договор.docx"
-
-    # Возвращаем полный путь к шаблону
-    return f"{base_path}/{template_name}.docx"
+    return contract_router.resolve(salary, template_name)
 
 
 def process_contracts_from_excel(excel_file, output_path="data/outgoing/Готовые_договора"):
@@ -243,10 +180,13 @@ def process_contracts_from_excel(excel_file, output_path="data/outgoing/Гото
 
     logger.info(f"Загружено строк: {len(all_data)}")
 
-    # Обрабатываем каждую строку
+    # Поврежденные шаблоны выявляются до рендеринга
+    preflight_templates()
+
+    # Определяем шаблон для каждой строки
     processed_count = 0
     error_count = 0
-    corrupted_templates = set()
+    jobs = []
 
     for row_data in all_data:
         row_dict = map_excel_row_to_dict(row_data)
@@ -264,30 +204,32 @@ def process_contracts_from_excel(excel_file, output_path="data/outgoing/Гото
             template_name = row_dict.get('a34')
 
             # Получаем путь к шаблону
-            template_path = get_template_path(template_name, salary)
-
-            # Пропускаем, если шаблон уже помечен как поврежденный
-            if template_path in corrupted_templates:
-                logger.warning(f"Пропуск {row_dict.get('a5')} - шаблон поврежден: {template_path}")
-                error_count += 1
-                continue
-
-            # Генерируем документ
-            try:
-                generate_document(row_dict, template_path, output_path)
-                processed_count += 1
-            except Exception as doc_error:
-                if "Bad CRC-32" in str(doc_error):
-                    corrupted_templates.add(template_path)
-                    logger.error(f"Поврежденный шаблон: {template_path}")
-                error_count += 1
-                continue
-
+            jobs.append((row_dict, get_template_path(template_name, salary)))
         except Exception as e:
             logger.error(f"Ошибка обработки строки для {row_dict.get('a5', 'неизвестно')}: {e}")
             error_count += 1
+
+    # Строки с шаблонами в карантине сообщаются до начала рендеринга
+    corrupted_templates = {}
+    for row_dict, template_path in jobs:
+        if quarantine_error(template_path) is not None:
+            corrupted_templates.setdefault(template_path, []).append(row_dict.get('a4_табельный_номер'))
+    for template, tab_numbers in corrupted_templates.items():
+        logger.error(f"Поврежденный шаблон {template} пропущен для {len(tab_numbers)} сотрудников: {tab_numbers}")
+
+    for row_dict, template_path in jobs:
+        if template_path in corrupted_templates:
+            error_count += 1
             continue
 
+        # Генерируем документ
+        try:
+            generate_document(row_dict, template_path, output_path)
+            processed_count += 1
+        except Exception as doc_error:
+            logger.error(f"Ошибка обработки строки для {row_dict.get('a5', 'неизвестно')}: {doc_error}")
+            error_count += 1
+
     finish = datetime.now()
     logger.info(f"Время окончания: {finish}")
     logger.info(f"Время работы: {finish - start}")
@@ -300,7 +242,7 @@ def process_contracts_from_excel(excel_file, output_path="data/outgoing/Гото
             logger.warning(f"  - {template}")
 
 
-def process_single_contract(excel_file, tabel_number, output_path="data/outgoing/Готовые_договора"):
+def process_single_contract(excel_file, tabel_number, output_path="data/outgoing/Готовые_договора", index=None):
     """
     Обработка одного трудового договора по табельному номеру
 
@@ -308,22 +250,23 @@ def process_single_contract(excel_file, tabel_number, output_path="data/outgoing
         excel_file: путь к Excel файлу
         tabel_number: табельный номер сотрудника
         output_path: путь для сохранения готового договора
+        index: индекс сотрудников (EmployeeIndex), если задан - поиск без чтения файла
 
     Returns:
         str/bool/None: путь к файлу если успешно, False если не найден, None если уже напечатан
     """
     logger.info(f"Поиск сотрудника с табельным номером: {tabel_number}")
 
-    # Загружаем все данные из Excel
-    all_data = get_all_data(excel_file)
-
-    if not all_data:
-        logger.error("Не удалось загрузить данные из Excel")
+    # Ищем строку с нужным табельным номером, чтение файла прекращается на найденной строке
+    try:
+        if index is not None:
+            row_data = index.get(tabel_number)
+        else:
+            row_data = get_contract_by_number(tabel_number, iter_staff_rows(excel_file))
+    except Exception as e:
+        logger.error(f"Не удалось загрузить данные из Excel: {e}")
         return False
 
-    # Ищем строку с нужным табельным номером
-    row_data = get_contract_by_number(tabel_number, all_data)
-
     if not row_data:
         logger.error(f"Сотрудник с табельным номером {tabel_number} не найден")
         return False
@@ -375,52 +318,16 @@ def generate_document_with_return(row_dict, file_dog, output_path):
             logger.error(f"Файл шаблона не найден: {file_dog}")
             return None
 
-        doc = DocxTemplate(file_dog)
+        doc = get_template(file_dog)
 
         # Определяем окончание по полу
         ending = "ый" if row_dict.get('a11') == "Мужчина" else "ая"
 
-        # Форматируем дату поступления
-        formatted_date = format_date(row_dict.get('a7'))
-
-        # Получение и проверка даты трудового договора
-        date = row_dict.get('a30')
+        # Форматируем дату поступления (так же, как в пакетном формировании договоров)
+        formatted_date = format_russian_date(row_dict.get('a7'), default=EMPTY_DATE)
 
-        if date is None or (isinstance(date, str) and len(date.split(".")) != 3):
-            day, month, year = "--", "--", "----"
-        else:
-            date_str = str(date)
-            parts = date_str.split(".")
-            if len(parts) == 3:
-                day, month, year = parts
-            else:
-                day, month, year = "--", "--", "----"
-
-        # Подготовка контекста для заполнения
-        context = {
-            "name_surname": f" {row_dict.get('a5', '')} ",
-            "name_surname_completely": f" {row_dict.get('a6', '')} ",
-            "date_admission": f" {formatted_date} ",
-            "ending": f"{ending}",
-            "post": f" {row_dict.get('a3', '')} ",
-            "district": f" {row_dict.get('a1', '')} ",
-            "salary": f" {row_dict.get('a9', '')} ",
-            "series_number": f"{row_dict.get('a14', '')}",
-            "phone": f"{row_dict.get('a12', '')}",
-            "address": f"{row_dict.get('a13', '')}",
-            "issue_date": f"{row_dict.get('a15', '')}",
-            "issued_by": f"{row_dict.get('a16', '')}",
-            "code": f"{row_dict.get('a17', '')}",
-            "official_salary": "должностной оклад",
-            "official_salary_termination": "должностного оклада",
-            "month_or_hour": "в месяц",
-            "district_pro": f" {row_dict.get('a19', '')} ",
-            "employment_contract_number": f" {row_dict.get('a25_номер_договора', '')}",
-            "day": f"{day}",
-            "month": f"{month}",
-            "year": f"{year}",
-            "graduation_from_profession": f" {row_dict.get('a28', '')} ",
-        }
+        # Контекст содержит только переменные шаблона (см. src.render_context)
+        context = build_context(file_dog, row_dict.get, formatted_date, ending)
 
         doc.render(context)
 
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+from loguru import logger
+
+from src.date_format import date_parts
+from src.template_cache import template_variables
+from src.template_preflight import quarantine_error
+
+# Переменные шаблонов, заполняемые из колонок строки: переменная -> (поле строки, формат значения)
+ROW_FIELDS = {
+    "name_surname": ("a5", " {} "),  # Ф.И.О. (Иванов Иван Иванович)
+    "name_surname_completely": ("a6", " {} "),  # Ф.И.О. (Иванов И. И.)
+    "post": ("a3", " {} "),  # Должность
+    "district": ("a1", " {} "),  # Участок
+    "salary": ("a9", " {} "),  # Часовая тарифная ставка или оклад
+    "series_number": ("a14", "{}"),  # Номер паспорта
+    "phone": ("a12", "{}"),  # Телефон
+    "address": ("a13", "{}"),  # Адрес
+    "issue_date": ("a15", "{}"),  # Дата выдачи
+    "issued_by": ("a16", "{}"),  # Кем выдан
+    "code": ("a17", "{}"),  # Код подразделения
+    "district_pro": ("a19", " {} "),  # Участок
+    "employment_contract_number": ("a25_номер_договора", " {}"),  # Номер трудового договора
+    "graduation_from_profession": ("a28", " {} "),  # Профессия в родительном падеже
+}
+
+# Постоянные значения
+CONSTANT_FIELDS = {
+    "official_salary": "должностной оклад",
+    "official_salary_termination": "должностного оклада",
+    "month_or_hour": "в месяц",
+}
+
+# Вычисляемые значения: переменная -> функция (get, formatted_date, ending)
+COMPUTED_FIELDS = {
+    "date_admission": lambda get, formatted_date, ending: f" {formatted_date} ",  # Дата поступления
+    "ending": lambda get, formatted_date, ending: f"{ending}",  # Окончание ый или ая
+    "day": lambda get, formatted_date, ending: date_parts(get("a30"))[0],  # День трудового договора
+    "month": lambda get, formatted_date, ending: date_parts(get("a30"))[1],  # Месяц
+    "year": lambda get, formatted_date, ending: date_parts(get("a30"))[2],  # Год
+}
+
+ALL_VARIABLES = frozenset(ROW_FIELDS) | frozenset(CONSTANT_FIELDS) | frozenset(COMPUTED_FIELDS)
+
+_plans = {}  # переменные шаблона -> (поля строки, постоянные, вычисляемые) для этих переменных
+
+
+def context_plan(variables):
+    """Поля контекста, нужные шаблону с заданными переменными (собирается один раз на набор переменных)"""
+    plan = _plans.get(variables)
+    if plan is None:
+        plan = (
+            [(key, field, pattern) for key, (field, pattern) in ROW_FIELDS.items() if key in variables],
+            {key: value for key, value in CONSTANT_FIELDS.items() if key in variables},
+            [(key, build) for key, build in COMPUTED_FIELDS.items() if key in variables],
+        )
+        unknown = variables - ROW_FIELDS.keys() - CONSTANT_FIELDS.keys() - COMPUTED_FIELDS.keys()
+        if unknown:
+            logger.warning(f"Переменные шаблона без источника данных (останутся пустыми): {sorted(unknown)}")
+        _plans[variables] = plan
+    return plan
+
+
+def required_variables(file_dog):
+    """
+    Переменные шаблона. Если шаблон в карантине или не читается, контекст собирается полностью,
+    а ошибка шаблона сообщается при рендеринге (и предварительной проверке)
+    """
+    if quarantine_error(file_dog) is not None:
+        return ALL_VARIABLES
+    try:
+        return template_variables(file_dog)
+    except Exception:
+        return ALL_VARIABLES
+
+
+def build_context(file_dog, get, formatted_date, ending):
+    """
+    Контекст рендеринга только из тех полей, которые использует шаблон
+
+    Args:
+        file_dog: путь к шаблону
+        get: функция получения значения колонки строки по имени поля (a0...a34)
+        formatted_date: дата поступления для документа
+        ending: окончание ый или ая
+
+    Returns:
+        dict: переменная шаблона -> значение
+    """
+    row_fields, constants, computed = context_plan(required_variables(file_dog))
+    context = dict(constants)
+    for key, field, pattern in row_fields:
+        context[key] = pattern.format(get(field))
+    for key, build in computed:
+        context[key] = build(get, formatted_date, ending)
+    return context
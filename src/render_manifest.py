@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from loguru import logger
+from peewee import chunked
+
+from src.batch_rendering import manifest_entry
+from src.database import db, connection, RenderedDocument
+from src.template_preflight import template_checksum
+
+MANIFEST_CHUNK_SIZE = 200  # Количество путей в одном запросе к манифесту (лимит параметров SQLite)
+
+
+def context_hash(context):
+    """sha256 данных, подставляемых в шаблон"""
+    data = json.dumps(context, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def output_file(job):
+    """Путь к документу задания"""
+    return f"{job['output_path']}/{job['filename']}"
+
+
+def split_up_to_date(jobs):
+    """
+    Отделение заданий, документы которых уже сформированы из тех же данных по тому же шаблону.
+    Документ формируется заново, если изменилась строка, шаблон или файл документа удален.
+
+    Args:
+        jobs: задания на рендеринг (см. src.batch_rendering.render_document)
+
+    Returns:
+        tuple: (задания для рендеринга, записи манифеста пропущенных строк)
+    """
+    for job in jobs:
+        job["context_hash"] = context_hash(job["context"])
+        job["template_hash"] = template_checksum(job["file_dog"])
+
+    paths = [output_file(job) for job in jobs]
+    known = {}
+    with connection():
+        for chunk in chunked(paths, MANIFEST_CHUNK_SIZE):
+            query = RenderedDocument.select().where(RenderedDocument.path.in_(chunk))
+            known.update({record.path: (record.context_hash, record.template_hash) for record in query})
+
+    dirty, skipped = [], []
+    for job, path in zip(jobs, paths):
+        if (job["template_hash"] is not None and known.get(path) == (job["context_hash"], job["template_hash"])
+                and os.path.exists(path)):
+            entry = manifest_entry(job, path=path)
+            entry["skipped"] = True  # Документ актуален
+            skipped.append(entry)
+        else:
+            dirty.append(job)
+    logger.info(f"Документов без изменений: {len(skipped)}, к формированию: {len(dirty)}")
+    return dirty, skipped
+
+
+def record_rendered(jobs, manifest):
+    """
+    Запись в манифест хешей успешно сформированных документов
+
+    Args:
+        jobs: задания, отданные на рендеринг
+        manifest: манифест рендеринга в порядке заданий
+    """
+    now = datetime.now()
+    rows = [
+        (entry["path"], job["context_hash"], job["template_hash"], now)
+        for job, entry in zip(jobs, manifest)
+        if entry["ok"] and job.get("template_hash") is not None
+    ]
+    if not rows:
+        return
+    fields = [RenderedDocument.path, RenderedDocument.context_hash, RenderedDocument.template_hash,
+              RenderedDocument.rendered]
+    with connection():
+        with db.atomic():
+            for batch in chunked(rows, MANIFEST_CHUNK_SIZE):
+                RenderedDocument.insert_many(batch, fields=fields).on_conflict_replace().execute()
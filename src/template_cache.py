@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import re
+import threading
+import zipfile
+from collections import OrderedDict
+
+from docxtpl import DocxTemplate
+from jinja2 import Template
+from loguru import logger
+
+TEMPLATE_CACHE_SIZE = 32  # Максимальное количество шаблонов, хранимых в кэше
+
+_cache = OrderedDict()  # (путь, mtime, размер) -> CompiledTemplate
+_lock = threading.Lock()
+
+
+class CompiledTemplate:
+    """Разобранный один раз шаблон .docx: содержимое файла и скомпилированное тело документа"""
+
+    __slots__ = ("path", "blob", "body", "_variables", "_templated_parts")
+
+    def __init__(self, path):
+        self.path = path
+        self._variables = None
+        self._templated_parts = None
+        with open(path, "rb") as f:
+            self.blob = f.read()  # Содержимое шаблона читается с диска один раз
+        parsed = DocxTemplate(io.BytesIO(self.blob))
+        parsed.init_docx()
+        # Подготовка XML тела документа так же, как это делает DocxTemplate.render
+        xml = parsed.patch_xml(parsed.get_xml())
+        self.body = Template(re.sub(r"<w:p([ >])", r"\n<w:p\1", xml))
+
+    def new_document(self):
+        """Дешевая копия шаблона для одного рендера"""
+        return CachedDocxTemplate(self)
+
+    @property
+    def variables(self):
+        """Переменные шаблона (тело, колонтитулы), определяются средствами docxtpl один раз"""
+        if self._variables is None:
+            parsed = DocxTemplate(io.BytesIO(self.blob))
+            self._variables = frozenset(parsed.get_undeclared_template_variables())
+        return self._variables
+
+    @property
+    def templated_parts(self):
+        """Части шаблона, кроме тела документа (колонтитулы, сноски, свойства), в которых есть теги Jinja"""
+        if self._templated_parts is None:
+            parsed = DocxTemplate(io.BytesIO(self.blob))
+            parts = []
+            with zipfile.ZipFile(io.BytesIO(self.blob)) as archive:
+                for name in archive.namelist():
+                    if not name.endswith(".xml") or name == "word/document.xml":
+                        continue
+                    # patch_xml склеивает теги, разбитые Word на несколько фрагментов текста
+                    xml = parsed.patch_xml(archive.read(name).decode("utf-8", errors="ignore"))
+                    if "{{" in xml or "{%" in xml:
+                        parts.append(name)
+            self._templated_parts = tuple(parts)
+        return self._templated_parts
+
+
+class CachedDocxTemplate(DocxTemplate):
+    """DocxTemplate, использующий заранее скомпилированное тело шаблона"""
+
+    def __init__(self, compiled):
+        super().__init__(io.BytesIO(compiled.blob))
+        self.compiled = compiled
+
+    def build_xml(self, context, jinja_env=None):
+        if jinja_env is not None:  # Пользовательское окружение Jinja - обычный путь docxtpl
+            return super().build_xml(context, jinja_env)
+        self.current_rendering_part = self.docx._part
+        xml = self.compiled.body.render(context)
+        xml = re.sub(r"\n<w:p([ >])", r"<w:p\1", xml)
+        xml = xml.replace("{_{", "{{").replace("}_}", "}}").replace("{_%", "{%").replace("%_}", "%}")
+        return self.resolve_listing(xml)
+
+
+def get_template(path):
+    """
+    Получение шаблона из кэша процесса. Шаблон разбирается один раз, на каждый рендер выдается новая копия.
+
+    Args:
+        path: путь к шаблону .docx
+
+    Returns:
+        CachedDocxTemplate: копия шаблона, готовая к рендеру
+    """
+    return _compiled(path).new_document()
+
+
+def template_variables(path):
+    """
+    Имена переменных, которые использует шаблон (из кэша процесса)
+
+    Args:
+        path: путь к шаблону .docx
+
+    Returns:
+        frozenset: имена переменных шаблона
+    """
+    return _compiled(path).variables
+
+
+def templated_parts(path):
+    """
+    Части шаблона вне тела документа с переменными (из кэша процесса)
+
+    Args:
+        path: путь к шаблону .docx
+
+    Returns:
+        tuple: имена частей архива .docx (например word/header1.xml)
+    """
+    return _compiled(path).templated_parts
+
+
+def _compiled(path):
+    """Разобранный шаблон из кэша, при отсутствии или изменении файла шаблон разбирается заново"""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        compiled = _cache.get(key)
+        if compiled is not None:
+            _cache.move_to_end(key)
+            return compiled
+
+    compiled = CompiledTemplate(path)  # Разбор шаблона вне блокировки
+    logger.debug(f"Шаблон загружен в кэш: {path}")
+    with _lock:
+        # Удаляем устаревшие версии этого же файла
+        for old_key in [k for k in _cache if k[0] == key[0] and k != key]:
+            del _cache[old_key]
+        _cache[key] = compiled
+        _cache.move_to_end(key)
+        while len(_cache) > TEMPLATE_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return compiled
+
+
+def clear_template_cache():
+    """Очистка кэша шаблонов"""
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import io
+import os
+import threading
+import zipfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from docxtpl import DocxTemplate
+from jinja2 import ChainableUndefined, Environment
+from loguru import logger
+
+from src.batch_rendering import get_workers, manifest_entry
+
+TEMPLATES_DIR = "data/docs_templates"  # Каталог шаблонов документов
+PLACEHOLDER = "1"  # Значение переменных при пробном рендере: годится и как строка, и как число для фильтров
+
+_checked = {}  # sha256 содержимого -> ошибка проверки или None (повторно проверяются только измененные шаблоны)
+_quarantine = {}  # абсолютный путь -> описание ошибки поврежденного шаблона
+_checksums = {}  # абсолютный путь -> sha256 шаблона на момент последней проверки
+_lock = threading.Lock()
+
+
+def checksum(path):
+    """Контрольная сумма sha256 файла шаблона"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def check_template(path):
+    """
+    Проверка шаблона: открытие архива .docx, проверка CRC всех частей и пробный рендер, в котором каждая
+    переменная шаблона заменена значением PLACEHOLDER (методы, фильтры и форматирование переменных работают,
+    в карантин попадают только ошибки архива, XML и синтаксиса Jinja)
+
+    Returns:
+        str | None: описание ошибки или None, если шаблон исправен
+    """
+    try:
+        with open(path, "rb") as f:
+            blob = f.read()
+        with zipfile.ZipFile(io.BytesIO(blob)) as archive:
+            broken = archive.testzip()
+            if broken is not None:
+                return f"Bad CRC-32 for file '{broken}'"
+        variables = DocxTemplate(io.BytesIO(blob)).get_undeclared_template_variables()
+        doc = DocxTemplate(io.BytesIO(blob))
+        # Прочие неопределенные имена (атрибуты, переменные циклов) не считаются ошибкой шаблона
+        doc.render({name: PLACEHOLDER for name in variables}, jinja_env=Environment(undefined=ChainableUndefined))
+        doc.save(io.BytesIO())
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+    return None
+
+
+def find_templates(templates_dir=TEMPLATES_DIR):
+    """Все шаблоны .docx в каталоге и его подкаталогах (временные файлы Word пропускаются)"""
+    paths = []
+    for root, _, files in os.walk(templates_dir):
+        for filename in files:
+            if filename.endswith(".docx") and not filename.startswith("~$"):
+                paths.append(os.path.join(root, filename))
+    return sorted(paths)
+
+
+def preflight_templates(templates_dir=TEMPLATES_DIR, workers=None):
+    """
+    Предварительная проверка всех шаблонов перед пакетом. Шаблоны проверяются параллельно в пуле процессов,
+    поврежденные помещаются в карантин и не используются до исправления файла.
+
+    Args:
+        templates_dir: каталог шаблонов
+        workers: количество процессов, по умолчанию из data/config.ini
+
+    Returns:
+        dict: путь к поврежденному шаблону -> описание ошибки
+    """
+    sums = {}
+    for path in find_templates(templates_dir):
+        try:
+            sums[path] = checksum(path)
+        except OSError as e:
+            sums[path] = None
+            _checked[path] = f"{type(e).__name__}: {e}"  # Файл не читается - проверять нечего
+
+    # Пробный рендер только для шаблонов, содержимое которых еще не проверялось
+    unchecked = sorted({path for path, digest in sums.items() if digest is not None and digest not in _checked})
+    if unchecked:
+        workers = min(workers or get_workers(), len(unchecked))
+        logger.info(f"Проверка шаблонов: {len(unchecked)}, процессов: {workers}")
+        if workers <= 1:
+            results = map(check_template, unchecked)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(check_template, unchecked))
+        for path, error in zip(unchecked, results):
+            _checked[sums[path]] = error
+
+    broken = {}
+    for path, digest in sums.items():
+        error = _checked.get(digest if digest is not None else path)
+        if error is not None:
+            broken[os.path.abspath(path)] = error
+    with _lock:
+        _quarantine.clear()
+        _quarantine.update(broken)
+        _checksums.clear()
+        _checksums.update({os.path.abspath(path): digest for path, digest in sums.items() if digest is not None})
+    for path, error in broken.items():
+        logger.error(f"Шаблон помещен в карантин: {path}: {error}")
+    logger.info(f"Проверено шаблонов: {len(sums)}, в карантине: {len(broken)}")
+    return broken
+
+
+def template_checksum(path):
+    """Контрольная сумма шаблона из последней проверки (вне каталога шаблонов считается заново), None - нет файла"""
+    with _lock:
+        digest = _checksums.get(os.path.abspath(path))
+    if digest is None:
+        try:
+            digest = checksum(path)
+        except OSError:
+            return None
+    return digest
+
+
+def quarantine_error(path):
+    """Описание ошибки шаблона, если он в карантине, иначе None"""
+    with _lock:
+        return _quarantine.get(os.path.abspath(path))
+
+
+def split_quarantined(jobs):
+    """
+    Отделение заданий, шаблоны которых в карантине. Затронутые строки сообщаются до начала рендеринга.
+
+    Args:
+        jobs: задания на рендеринг (см. src.batch_rendering.render_document)
+
+    Returns:
+        tuple: (задания с исправными шаблонами, записи манифеста для строк с поврежденными шаблонами)
+    """
+    ready, failed = [], []
+    affected = defaultdict(list)
+    for job in jobs:
+        error = quarantine_error(job["file_dog"])
+        if error is None:
+            ready.append(job)
+            continue
+        failed.append(manifest_entry(job, error=f"Шаблон в карантине: {job['file_dog']}: {error}"))
+        affected[job["file_dog"]].append(job.get("tab_number"))
+    for path, tab_numbers in affected.items():
+        logger.error(f"Поврежденный шаблон {path} пропущен для {len(tab_numbers)} сотрудников: {tab_numbers}")
+    return ready, failed
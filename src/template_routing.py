@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+import os
+from collections import defaultdict
+
+from loguru import logger
+
+from src.template_cache import get_template
+
+CONTRACT_TEMPLATES_DIR = "data/docs_templates/Шаблоны_трудовых_договоров"  # Шаблоны трудовых договоров
+ITR = "ИТР"  # Оклад (более 1000)
+WORKER = "Рабочий"  # Часовая тарифная ставка
+DEFAULT_TEMPLATE = "None"  # Значение колонки AI для основного шаблона
+
+# Маршруты, заданные явно: (класс оплаты, колонка AI) -> шаблон относительно CONTRACT_TEMPLATES_DIR.
+# Остальные значения колонки AI ищутся среди файлов каталога класса оплаты ({класс}/{значение}.docx)
+CONTRACT_ROUTES = {
+    (ITR, DEFAULT_TEMPLATE): "ИТР/Шаблон_трудовой_договор.docx",
+    (ITR, "Шаблон_трудовой_договор_уборщ_8_часов"): "ИТР/Шаблон_трудовой_договор_уборщ_8_часов.docx",
+    (ITR, "Шаблон_трудовой_договор_8_часов_ИТР_подземные"): "ИТР/Шаблон_трудовой_договор_8_часов_ИТР_подземные.docx",
+    (ITR, "Шаблон_трудовой_договор_12_часов"): "ИТР/Шаблон_трудовой_договор_12_часов.docx",
+    (ITR, "Шаблон_трудовой_договор_6_часов"): "ИТР/Шаблон_трудовой_договор_6_часов.docx",
+    (ITR, "Шаблон_трудовой_договор_7_часов"): "ИТР/Шаблон_трудовой_договор_7_часов.docx",
+    (ITR, "Шаблон_трудовой_договор_8_часов_ИТР_контора_вредность_не_норм_7"):
+        "ИТР/Шаблон_трудовой_договор_8_часов_ИТР_контора_вредность_не_норм_7.docx",
+    (ITR, "Шаблон_трудовой_договор_водителя_8_часов"): "ИТР/Шаблон_трудовой_договор_водителя_8_часов.docx",
+    (ITR, "Шаблон_трудовой_договор_8_часов_ИТР_без_вредности"):
+        "ИТР/Шаблон_трудовой_договор_8_часов_ИТР_без_вредности.docx",
+    (ITR, "Шаблон_трудовой_договор_24_часа_без_вредн"): "Рабочий/Шаблон_трудовой_договор_24_часа_без_вредн.docx",
+    (WORKER, DEFAULT_TEMPLATE): "Рабочий/Шаблон_трудовой_договор.docx",
+    (WORKER, "Шаблон_трудовой_договор_уборщ_8_часов"): "Рабочий/Шаблон_трудовой_договор_уборщ_8_часов.docx",
+    (WORKER, "Шаблон_трудовой_договор_8_часов_ИТР_подземные"):
+        "Рабочий/Шаблон_трудовой_договор_8_часов_ИТР_подземные.docx",
+    (WORKER, "Шаблон_трудовой_договор_12_часов"): "Рабочий/Шаблон_трудовой_договор_12_часов.docx",
+    (WORKER, "ТД_6_час.раб."): "Рабочий/ТД_6_час.раб..docx",
+    (WORKER, "Шаблон_трудовой_договор_7_часов"): "Рабочий/Шаблон_трудовой_договор_7_часов.docx",
+    (WORKER, "Шаблон_трудовой_договор_8_часов_ИТР_контора_вредность_не_норм_7"):
+        "Рабочий/Шаблон_трудовой_договор_8_часов_ИТР_контора_вредность_не_норм_7.docx",
+    (WORKER, "Шаблон_трудовой_договор_водителя_8_часов"): "Рабочий/Шаблон_трудовой_договор_водителя_8_часов.docx",
+}
+
+
+def salary_class(salary):
+    """Класс оплаты по окладу (колонка J числом): оклад (ИТР) или часовая тарифная ставка (Рабочий)"""
+    return ITR if salary is not None and salary > 1000 else WORKER
+
+
+def template_key(template_name):
+    """Значение колонки AI как ключ маршрута (пустое значение - основной шаблон)"""
+    if template_name is None or str(template_name).strip() in ("", DEFAULT_TEMPLATE):
+        return DEFAULT_TEMPLATE
+    return str(template_name).strip()
+
+
+class TemplateRouter:
+    """
+    Таблица маршрутов (класс оплаты, колонка AI) -> шаблон трудового договора.
+    Проверяется по файлам на диске один раз, дальше каждый шаблон определяется одним поиском в словаре.
+    """
+
+    def __init__(self, routes=CONTRACT_ROUTES, base_dir=CONTRACT_TEMPLATES_DIR):
+        self.routes = routes
+        self.base_dir = base_dir
+        self.table = None  # (класс оплаты, колонка AI) -> путь к существующему шаблону
+        self.missing = {}  # Явные маршруты, шаблонов которых нет на диске
+
+    def validate(self):
+        """
+        Построение таблицы маршрутов по файлам на диске и загрузка шаблонов в кэш
+
+        Returns:
+            dict: маршруты, для которых шаблон не найден на диске
+        """
+        table = {}
+        # Шаблоны, лежащие в каталогах классов оплаты, доступны по имени файла
+        for cls in (ITR, WORKER):
+            directory = os.path.join(self.base_dir, cls)
+            if os.path.isdir(directory):
+                for filename in os.listdir(directory):
+                    if filename.endswith(".docx"):
+                        table[(cls, filename[:-len(".docx")])] = f"{self.base_dir}/{cls}/{filename}"
+
+        missing = {}
+        for key, relative in self.routes.items():
+            path = f"{self.base_dir}/{relative}"
+            if os.path.exists(path):
+                table[key] = path
+            else:
+                missing[key] = path
+                table.pop(key, None)
+                logger.warning(f"Шаблон не найден на диске: {path} ({key[0]}, {key[1]})")
+
+        for path in set(table.values()):
+            try:
+                get_template(path)  # Шаблон разбирается заранее
+            except Exception as e:
+                logger.error(f"Не удалось загрузить шаблон {path}: {e}")
+
+        self.table, self.missing = table, missing
+        logger.info(f"Маршрутов шаблонов трудовых договоров: {len(table)}, не найдено шаблонов: {len(missing)}")
+        return missing
+
+    def resolve(self, salary, template_name):
+        """
+        Шаблон трудового договора по окладу и колонке AI
+
+        Raises:
+            ValueError: для значения колонки AI нет шаблона
+        """
+        if self.table is None:
+            self.validate()
+        key = (salary_class(salary), template_key(template_name))
+        path = self.table.get(key)
+        if path is None:
+            raise ValueError(f"Неизвестный шаблон трудового договора: {key[1]} ({key[0]})")
+        return path
+
+    def report_unknown(self, rows):
+        """
+        Проверка всего пакета до рендеринга: значения колонки AI, для которых нет шаблона
+
+        Args:
+            rows: записи сотрудников (a4_табельный_номер, salary, a34)
+
+        Returns:
+            dict: (класс оплаты, колонка AI) -> табельные номера строк
+        """
+        if self.table is None:
+            self.validate()
+        unknown = defaultdict(list)
+        for row in rows:
+            key = (salary_class(row.salary), template_key(row.a34))
+            if key not in self.table:
+                unknown[key].append(row.a4_табельный_номер)
+        for (cls, name), tab_numbers in unknown.items():
+            logger.error(f"Нет шаблона {name} ({cls}) для {len(tab_numbers)} сотрудников: {tab_numbers}")
+        return dict(unknown)
+
+
+contract_router = TemplateRouter()  # Таблица маршрутов, проверяется при запуске приложения
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import os
+import shutil
+import time
+import uuid
+
+from loguru import logger
+
+UPLOAD_DIR = "data/uploads"  # Каталог загруженных файлов
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # Размер фрагмента при записи загрузки на диск (байт)
+UPLOAD_MAX_AGE = 24 * 60 * 60  # Загрузки старше (секунд) удаляются при следующей загрузке
+
+
+async def save_upload(upload, directory=UPLOAD_DIR):
+    """
+    Сохранение загруженного файла на диск фрагментами, без чтения целиком в память (в пуле потоков)
+
+    Args:
+        upload: загруженный файл (fastapi.UploadFile)
+        directory: каталог для сохранения
+
+    Returns:
+        str: путь к сохраненному файлу
+    """
+    os.makedirs(directory, exist_ok=True)
+    prune_uploads(directory)
+    name = os.path.basename(upload.filename or "upload")
+    path = os.path.join(directory, f"{uuid.uuid4().hex}_{name}")
+
+    def copy():
+        with open(path, "wb") as f:
+            shutil.copyfileobj(upload.file, f, UPLOAD_CHUNK_SIZE)
+
+    await asyncio.to_thread(copy)
+    logger.info(f"Файл загружен: {path} ({os.path.getsize(path)} байт)")
+    return path
+
+
+def resolve_input_path(path):
+    """
+    Проверка пути к файлу на сервере (сетевой диск, общая папка)
+
+    Raises:
+        FileNotFoundError: файл не найден
+    """
+    if not path or not os.path.isfile(path):
+        raise FileNotFoundError(f"Файл не найден: {path}")
+    return path
+
+
+def original_name(path):
+    """Имя файла для скачивания: у загруженных файлов без уникального префикса"""
+    name = os.path.basename(path)
+    if os.path.dirname(os.path.abspath(path)) == os.path.abspath(UPLOAD_DIR):
+        return name.split("_", 1)[-1]
+    return name
+
+
+def remove_upload(path):
+    """Удаление загруженного файла после обработки"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def prune_uploads(directory=UPLOAD_DIR, max_age=UPLOAD_MAX_AGE):
+    """Удаление загрузок старше max_age секунд"""
+    deadline = time.time() - max_age
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.stat().st_mtime < deadline:
+            remove_upload(entry.path)
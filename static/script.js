@@ -8,7 +8,11 @@ async function handleAction(actionId) {
             body: `user_input=${actionId}`,
         });
 
-        if (response.ok) {
+        if (response.status === 202) {
+            // Длительная задача поставлена в очередь, сервер вернул идентификатор задачи
+            const job = await response.json();
+            showJobProgress(job);
+        } else if (response.ok) {
             // Если сервер вернул Redirect (код 303), перенаправляем на URL из ответа
             const url = response.url;
             window.location.href = url;
@@ -19,4 +23,93 @@ async function handleAction(actionId) {
         console.error('Ошибка:', error);
         alert('Произошла ошибка!');
     }
-}
\ No newline at end of file
+}
+
+// Загрузка выбранного файла Excel на сервер и запуск задачи по нему
+async function uploadForJob(url, input) {
+    const file = input.files[0];
+    if (!file) {
+        return;
+    }
+    const body = new FormData();
+    body.append('file', file);
+    input.value = '';  // Повторный выбор того же файла снова запускает задачу
+    await postJob(url, body);
+}
+
+// Отправка формы с файлом как фоновой задачи (страница не перезагружается)
+function submitJobForm(form) {
+    const body = new FormData(form);
+    if (!body.get('max_row')) {
+        body.delete('max_row');  // Пустое поле - до конца файла
+    }
+    postJob(form.action, body);
+    return false;
+}
+
+async function postJob(url, body) {
+    try {
+        const response = await fetch(url, {method: 'POST', body});
+        if (response.status === 202) {
+            showJobProgress(await response.json());
+        } else {
+            const data = await response.json().catch(() => ({}));
+            alert(data.detail || 'Ошибка при загрузке файла!');
+        }
+    } catch (error) {
+        console.error('Ошибка:', error);
+        alert('Произошла ошибка!');
+    }
+}
+
+// Панель прогресса фоновой задачи: строки, скорость, оставшееся время и ошибки строк
+function showJobProgress(job) {
+    let panel = document.getElementById('job-progress');
+    if (!panel) {
+        panel = document.createElement('div');
+        panel.id = 'job-progress';
+        panel.className = 'progress-panel';
+        document.body.appendChild(panel);
+    }
+    panel.innerHTML = `
+        <div class="progress-title">Задача: ${job.job_type}</div>
+        <progress class="progress-bar" value="0" max="1"></progress>
+        <div class="progress-text">В очереди...</div>
+        <ul class="progress-errors"></ul>`;
+
+    const bar = panel.querySelector('.progress-bar');
+    const text = panel.querySelector('.progress-text');
+    const errors = panel.querySelector('.progress-errors');
+    const source = new EventSource(`/jobs/${job.job_id}/progress`);
+
+    source.onmessage = (event) => {
+        const data = JSON.parse(event.data);
+        const progress = data.progress;
+        bar.max = progress.total || 1;
+        bar.value = progress.done;
+        if (data.status === 'queued') {
+            text.textContent = 'В очереди...';
+        } else if (data.status === 'error') {
+            text.textContent = `Ошибка: ${data.error}`;
+        } else {
+            const eta = progress.eta !== null ? `, осталось ~${Math.ceil(progress.eta)} с` : '';
+            const state = data.status === 'done' ? 'Готово' : 'Выполняется';
+            text.textContent = `${state}: ${progress.done} из ${progress.total} (${progress.rate} строк/с${eta}), ` +
+                `ошибок: ${progress.error_count}`;
+        }
+        errors.replaceChildren(...progress.errors.map((error) => {
+            const item = document.createElement('li');
+            item.textContent = `${error.tab_number} ${error.name || ''}: ${error.error}`;
+            return item;
+        }));
+        if (data.status === 'done' && data.download_url) {
+            // Файл результата задачи (например, Excel с исправленными профессиями)
+            const link = document.createElement('a');
+            link.href = data.download_url;
+            link.textContent = 'Скачать результат';
+            text.append(' ', link);
+        }
+    };
+    source.addEventListener('end', () => source.close());
+    source.onerror = () => source.close();
+}